@@ -0,0 +1,157 @@
+"""
+Generators of benchmark instances of growing size.
+
+Each generator returns a Case with the program files, the answer set and the query to explain.
+"""
+
+import random
+from dataclasses import dataclass
+
+import clingo
+
+
+@dataclass
+class Case:
+    name: str
+    files: dict[str, str]
+    answer: str
+    query: str
+    false: str = ""
+
+
+def _answer_set(program: str, assumptions=()) -> str:
+    control = clingo.Control(["--warn=none"])
+    control.add("base", [], program)
+    control.ground([("base", [])])
+    atoms: list[clingo.Symbol] = []
+    with control.solve(
+        assumptions=[(atom, True) for atom in assumptions], yield_=True
+    ) as handle:
+        for model in handle:
+            atoms = model.symbols(atoms=True)
+            break
+        else:
+            raise ValueError("the generated instance has no answer set")
+    return " ".join(f"{atom}." for atom in sorted(atoms))
+
+
+def sudoku_encoding(size: int) -> str:
+    """
+    The encoding of examples/sudoku/encoding9x9.lp for a size x size grid.
+    """
+    block = int(size**0.5)
+    if block * block != size:
+        raise ValueError("the size of a sudoku must be a square")
+    return "\n".join(
+        [
+            f"{{assign((Row, Col), Value) : Value = 1..{size}}} = 1 :- Row = 1..{size}; Col = 1..{size}.",
+            ":- block(Block, Cell); block(Block, Cell'), Cell != Cell'; assign(Cell, Value), assign(Cell', Value).",
+            ":- given(Cell, Value), not assign(Cell, Value).",
+            "",
+            f"block((row, Row), (Row, Col)) :- Row = 1..{size}, Col = 1..{size}.",
+            f"block((col, Col), (Row, Col)) :- Row = 1..{size}, Col = 1..{size}.",
+            f"block((sub, Row', Col'), (Row, Col)) :- Row = 1..{size}; Col = 1..{size}; "
+            f"Row' = (Row-1) / {block}; Col' = (Col-1) / {block}.",
+        ]
+    )
+
+
+def sudoku(size: int, given: float = 0.4, seed: int = 0) -> Case:
+    """
+    A size x size sudoku whose solution follows the usual shifted pattern; a fraction of the cells is given.
+
+    The query is the value of the first cell that is not given.
+    """
+    block = int(size**0.5)
+
+    def value(row: int, col: int) -> int:
+        return ((row - 1) * block + (row - 1) // block + col - 1) % size + 1
+
+    cells = [(row, col) for row in range(1, size + 1) for col in range(1, size + 1)]
+    rng = random.Random(seed)
+    given_cells = set(rng.sample(cells, max(1, int(len(cells) * given))))
+    instance = "\n".join(
+        f"given(({row},{col}),{value(row, col)})."
+        for row, col in cells
+        if (row, col) in given_cells
+    )
+    encoding = sudoku_encoding(size)
+    solution = [
+        clingo.Function(
+            "assign",
+            [
+                clingo.Tuple_([clingo.Number(row), clingo.Number(col)]),
+                clingo.Number(value(row, col)),
+            ],
+        )
+        for row, col in cells
+    ]
+    row, col = next(cell for cell in cells if cell not in given_cells)
+    return Case(
+        name=f"sudoku{size}x{size}",
+        files={"encoding.lp": encoding, "instance.lp": instance},
+        answer=_answer_set(encoding + "\n" + instance, solution),
+        query=f"assign(({row},{col}),{value(row, col)}).",
+    )
+
+
+def chain(length: int) -> Case:
+    """
+    A support chain p(0), ..., p(length) as in examples/basic/support_var.lp; the query is its last atom.
+    """
+    instance = "\n".join(f"succ({index},{index + 1})." for index in range(length))
+    encoding = "p(0).\np(Y) :- p(X), succ(X,Y)."
+    return Case(
+        name=f"chain{length}",
+        files={"encoding.lp": encoding, "instance.lp": instance},
+        answer=_answer_set(encoding + "\n" + instance),
+        query=f"p({length}).",
+    )
+
+
+def loop(length: int) -> Case:
+    """
+    A positive loop q(0), ..., q(length - 1) without external support, as in examples/basic/loop.lp.
+
+    The query is the (false) first atom of the loop, whose explanation needs the whole unfounded set.
+    """
+    instance = "\n".join(
+        f"node({index}). succ({index},{(index + 1) % length})."
+        for index in range(length)
+    )
+    encoding = "q(Y) :- q(X), succ(X,Y).\nr(X) :- node(X), not q(X)."
+    return Case(
+        name=f"loop{length}",
+        files={"encoding.lp": encoding, "instance.lp": instance},
+        answer=_answer_set(encoding + "\n" + instance),
+        query="q(0).",
+    )
+
+
+SUITES = {
+    "quick": [
+        lambda: sudoku(4),
+        lambda: chain(10),
+        lambda: loop(10),
+    ],
+    "default": [
+        lambda: sudoku(4),
+        lambda: sudoku(9),
+        lambda: chain(10),
+        lambda: chain(50),
+        lambda: loop(10),
+        lambda: loop(50),
+    ],
+    "full": [
+        lambda: sudoku(4),
+        lambda: sudoku(9),
+        lambda: sudoku(16),
+        lambda: sudoku(25),
+        lambda: chain(10),
+        lambda: chain(100),
+        lambda: chain(1000),
+        lambda: loop(10),
+        lambda: loop(100),
+        lambda: loop(1000),
+    ],
+}
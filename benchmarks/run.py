@@ -0,0 +1,244 @@
+"""
+Run the benchmark suite, save the per-stage measures as JSON and compare them against a baseline.
+
+Each case runs ``python -m ucorexplain --profile-json`` in a fresh process, so that stages and memory are measured
+on the same pipeline as the command line and cases do not share caches or memory.
+
+Usage::
+
+    python benchmarks/run.py [--suite quick|default|full] [--repeat N] [--baseline FILE] [--save-baseline]
+                             [--clingo-args ARGS [--reference-args ARGS]]
+
+The exit code is 1 if some stage is slower (or uses more memory) than in the baseline beyond the tolerance.
+With --clingo-args, every case also runs with the given clingo arguments (e.g., ``--parallel-mode=4``) and
+with the reference ones (single-threaded by default), and the speedup of the whole run and of the
+explanation is reported.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Sequence
+
+from generate import SUITES, Case
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_case(case: Case, repeat: int, extra: Sequence[str] = ()) -> dict:
+    """
+    Run a case repeat times, with the extra command line arguments, and keep, for each stage, the best measures.
+    """
+    stages: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        command = [sys.executable, "-m", "ucorexplain"]
+        for name, content in case.files.items():
+            file_name = os.path.join(directory, name)
+            with open(file_name, "w") as f:
+                f.write(content)
+            command.extend(["--prg", file_name])
+        profile = os.path.join(directory, "profile.json")
+        command.extend(
+            [
+                "--answer",
+                case.answer,
+                "--false",
+                case.false,
+                "--query",
+                case.query,
+                "--no-cache",
+                "--profile-json",
+                profile,
+                *extra,
+            ]
+        )
+        for _ in range(repeat):
+            start = time.perf_counter()
+            start_cpu = _children_cpu()
+            process = subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                cwd=directory,
+                text=True,
+            )
+            if process.returncode != 0:
+                raise RuntimeError(f"{case.name} failed:\n{process.stderr}")
+            total = time.perf_counter() - start
+            total_cpu = _children_cpu() - start_cpu
+            with open(profile) as f:
+                report = json.load(f)
+            measures = {stage.pop("name"): stage for stage in report["stages"]}
+            measures["total"] = {
+                "wall": total,
+                "cpu": total_cpu,
+                "max_rss": report["max_rss"],
+            }
+            for name, stage in measures.items():
+                best = stages.setdefault(name, dict(stage))
+                for key in ("wall", "cpu", "max_rss"):
+                    best[key] = min(best[key], stage[key])
+    return stages
+
+
+def speedup(reference: dict, measures: dict) -> dict:
+    """
+    Return the speedups of the measures over the reference, for the whole run and for the explanation graph.
+    """
+    result = {}
+    for stage in ("total", "explanation graph"):
+        if stage in reference and stage in measures:
+            result[stage] = reference[stage]["wall"] / max(
+                measures[stage]["wall"], 1e-9
+            )
+    return result
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float, min_delta: float
+) -> list[str]:
+    """
+    Return a message for each stage slower (or larger) than in the baseline.
+    """
+    regressions = []
+    for case, stages in results["cases"].items():
+        for stage, measures in stages.items():
+            expected = baseline.get("cases", {}).get(case, {}).get(stage)
+            if expected is None:
+                continue
+            wall, old_wall = measures["wall"], expected["wall"]
+            if wall > old_wall * (1 + tolerance) and wall - old_wall > min_delta:
+                regressions.append(
+                    f"{case}/{stage}: wall {old_wall:.3f}s -> {wall:.3f}s"
+                )
+            rss, old_rss = measures["max_rss"], expected["max_rss"]
+            if rss > old_rss * (1 + tolerance):
+                regressions.append(
+                    f"{case}/{stage}: max rss {old_rss / 2**20:.1f} MiB -> {rss / 2**20:.1f} MiB"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suite", choices=sorted(SUITES), default="default")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs per case; the best one is kept [%(default)s]",
+    )
+    parser.add_argument(
+        "--output", default=os.path.join(HERE, "results.json"), help="[%(default)s]"
+    )
+    parser.add_argument(
+        "--baseline", default=os.path.join(HERE, "baseline.json"), help="[%(default)s]"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also save the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slowdown reported as a regression [%(default)s]",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.1,
+        help="slowdowns of fewer seconds are never reported as regressions [%(default)s]",
+    )
+    parser.add_argument(
+        "--clingo-args",
+        default=None,
+        metavar="ARGS",
+        help="also run every case with these clingo arguments and report the speedup",
+    )
+    parser.add_argument(
+        "--reference-args",
+        default="--parallel-mode=1",
+        metavar="ARGS",
+        help="clingo arguments of the runs the speedup is measured against [%(default)s]",
+    )
+    args = parser.parse_args()
+
+    results: dict = {
+        "suite": args.suite,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {},
+    }
+    for make_case in SUITES[args.suite]:
+        case = make_case()
+        results["cases"][case.name] = run_case(case, args.repeat)
+        print(
+            f"{case.name}: {results['cases'][case.name]['total']['wall']:.3f}s",
+            flush=True,
+        )
+        if args.clingo_args is not None:
+            reference = run_case(
+                case, args.repeat, [f"--clingo-args={args.reference_args}"]
+            )
+            measures = run_case(
+                case, args.repeat, [f"--clingo-args={args.clingo_args}"]
+            )
+            speedups = speedup(reference, measures)
+            results.setdefault(
+                "speedup",
+                {
+                    "clingo_args": args.clingo_args,
+                    "reference_args": args.reference_args,
+                    "cases": {},
+                },
+            )["cases"][case.name] = {
+                "reference": reference,
+                "measures": measures,
+                "speedup": speedups,
+            }
+            print(
+                f"{case.name} with {args.clingo_args}: {measures['total']['wall']:.3f}s, "
+                + ", ".join(
+                    f"{stage} {value:.2f}x" for stage, value in speedups.items()
+                )
+                + f" over {args.reference_args}",
+                flush=True,
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved in {args.output}")
+
+    status = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions with respect to {args.baseline}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved in {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Measure the startup time of the command line: importing the package, printing the help, and a small explanation
+printed as text.
+
+Usage::
+
+    python benchmarks/startup.py [--repeat N] [--baseline FILE] [--save-baseline]
+
+The median of the runs is kept; the exit code is 1 if a command is slower than in the baseline beyond the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from run import compare
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+COMMANDS = {
+    "import": ["-c", "import ucorexplain"],
+    "help": ["-m", "ucorexplain", "--help"],
+    "explain": [
+        "-m",
+        "ucorexplain",
+        "--prg",
+        "examples/paper/example5.lp",
+        "--query",
+        "p(a).",
+        "--answer",
+        "s(a,b). s(b,a). p(a). r(a).",
+        "--no-cache",
+    ],
+}
+
+
+def run_command(arguments: list[str], repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *arguments],
+            check=True,
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        times.append(time.perf_counter() - start)
+    return {"wall": statistics.median(times), "max_rss": 0}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per command [%(default)s]"
+    )
+    parser.add_argument(
+        "--output",
+        default=os.path.join(HERE, "startup_results.json"),
+        help="[%(default)s]",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=os.path.join(HERE, "startup_baseline.json"),
+        help="[%(default)s]",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also save the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slowdown reported as a regression [%(default)s]",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.1,
+        help="slowdowns of fewer seconds are never reported as regressions [%(default)s]",
+    )
+    args = parser.parse_args()
+
+    results: dict = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {},
+    }
+    for name, arguments in COMMANDS.items():
+        measures = run_command(arguments, args.repeat)
+        results["cases"][name] = {"total": measures}
+        print(f"{name}: {measures['wall']:.3f}s", flush=True)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved in {args.output}")
+
+    status = 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.min_delta)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions with respect to {args.baseline}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved in {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
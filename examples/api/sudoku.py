@@ -1,30 +1,23 @@
 from dumbo_asp.queries import pack_xasp_navigator_url, explanation_graph
 from dumbo_asp.primitives.models import Model
-from dumbo_asp.primitives.atoms import SymbolicAtom, GroundAtom
-from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.atoms import SymbolicAtom
 
-from ucorexplain import program_from_files, visualize, save_graph
+from ucorexplain import program_from_files, solve, visualize
+from ucorexplain.utils.reorder import move_before
 
 program = program_from_files(
     ["examples/sudoku/instance4x4.lp", "examples/sudoku/encoding4x4.lp"]
 )
 
-# the answer set contains only the atoms assigned true
-answer_set = Model.of_program(program)
-
 # the query is a set of atoms (assignment implicit from the answer set)
 query = Model.of_atoms("assign((1,2),2)")
 
 # other (false) atoms that the user want to include (if any)
 explicitly_mentioned_atoms = Model.of_atoms()
 
-# we expand the HB by disabling fact simplifications
-herbrand_base = SymbolicProgram.of(
-    *program,
-    *SymbolicProgram.parse(answer_set.as_facts),
-    *SymbolicProgram.parse(query.as_facts),
-    *SymbolicProgram.parse(explicitly_mentioned_atoms.as_facts),
-).herbrand_base
+# the answer set contains only the atoms assigned true (here the first one);
+# the HB is expanded by disabling fact simplifications, from the same grounding
+answer_set, herbrand_base = solve(program, 1, query, explicitly_mentioned_atoms)
 
 # LET USERS EXPAND THE VARIABLES THEY LIKE AND REORDER THE PROGRAM AS THEY WISH
 program = program.expand_global_safe_variables(
@@ -32,21 +25,16 @@ program = program.expand_global_safe_variables(
 )
 program = program.move_before(SymbolicAtom.parse("block(Block, Cell)"))
 
-# possibly move_before also on the herbrand_base
-herbrand_base = SymbolicProgram.parse(
-    herbrand_base.as_facts
-)  # temporary switch to a program (of facts)
-herbrand_base = herbrand_base.move_before(SymbolicAtom.parse("assign((Row,Col), 2)"))
-herbrand_base = herbrand_base.move_before(SymbolicAtom.parse("assign((1,Col), 2)"))
-herbrand_base = herbrand_base.move_before(
-    SymbolicAtom.parse("assign((Row,2), 2)")
-)  # this is the second most important
-herbrand_base = herbrand_base.move_before(
-    SymbolicAtom.parse("assign((1,2), 2)")
-)  # this is the most important
-herbrand_base = tuple(
-    GroundAtom.parse(str(rule.head_atom)) for rule in herbrand_base
-)  # back to an iterable of GroundAtoms
+# possibly move_before also on the herbrand_base (the last pattern is the most important)
+herbrand_base = move_before(
+    herbrand_base,
+    [
+        "assign((Row,Col), 2)",
+        "assign((1,Col), 2)",
+        "assign((Row,2), 2)",  # this is the second most important
+        "assign((1,2), 2)",  # this is the most important
+    ],
+)
 
 # compute DAG
 graph = explanation_graph(
@@ -56,8 +44,7 @@ graph = explanation_graph(
     query=query,
 )
 
-# save_graph(graph)
-# visualize("./graph.lp")
+# visualize(graph)
 
 pack_xasp_navigator_url(
     graph,
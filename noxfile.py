@@ -76,3 +76,15 @@ def test(session):
     session.install("-e", ".[test]")
     session.run("coverage", "run", "-m", "unittest", "discover", "-v")
     session.run("coverage", "report", "-m", "--fail-under=100")
+
+
+@nox.session
+def benchmark(session):
+    session.install("-e", ".")
+    session.run("python", "benchmarks/run.py", *session.posargs)
+
+
+@nox.session
+def benchmark_startup(session):
+    session.install("-e", ".")
+    session.run("python", "benchmarks/startup.py", *session.posargs)
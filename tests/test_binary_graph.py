@@ -0,0 +1,111 @@
+"""
+Test the binary format of explanation graphs.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+from ucorexplain import (
+    herbrand_base_of,
+    load_graph_binary,
+    parse_model,
+    program_from_files,
+    save_graph_binary,
+)
+from ucorexplain.explainer import Explainer
+from ucorexplain.explanation import LazyExplanation, incomplete
+
+
+class TestBinaryGraph(unittest.TestCase):
+    """
+    Test saving and loading graphs in the binary format.
+    """
+
+    def setUp(self):
+        program = program_from_files(["examples/paper/example5.lp"])
+        answer_set = parse_model("s(a,b). s(b,a). p(a). r(a).", "answer set")
+        query = parse_model("p(a).", "query")
+        false_atoms = parse_model("", "false atoms")
+        herbrand_base = herbrand_base_of(program, answer_set, query, false_atoms)
+        self.query = query
+        self.graph = Explainer(program, herbrand_base).explain(answer_set, query)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.file_name = os.path.join(directory, "graph.ucxg")
+
+    def test_round_trip(self):
+        """
+        Test that a saved graph is loaded with the same nodes and links.
+        """
+        save_graph_binary(self.graph, self.file_name)
+        with load_graph_binary(self.file_name) as graph:
+            nodes = [atom for atom in self.graph if atom.predicate_name == "node"]
+            links = [atom for atom in self.graph if atom.predicate_name == "link"]
+            self.assertEqual(graph.number_of_nodes, len(nodes))
+            self.assertEqual(graph.number_of_links, len(links))
+            self.assertEqual(
+                {str(atom) for atom in graph.to_model()},
+                {str(atom) for atom in self.graph},
+            )
+            name, value, reason = nodes[0].arguments
+            self.assertEqual(
+                graph.node(0)[:3],
+                (name.string, value.name == "true", str(reason.arguments[0])),
+            )
+            self.assertEqual(
+                graph.link(0), tuple(argument.string for argument in links[0].arguments)
+            )
+
+    def assert_round_trip(self, graph):
+        """
+        Save and load the graph, and compare its atoms.
+        """
+        save_graph_binary(graph, self.file_name)
+        with load_graph_binary(self.file_name) as loaded:
+            self.assertEqual(
+                {str(atom) for atom in loaded.to_model()},
+                {str(atom) for atom in graph},
+            )
+            return loaded.incomplete
+
+    def test_truncated(self):
+        """
+        Test that the reasons hidden by a depth limit are kept.
+        """
+        graph = LazyExplanation(self.graph, self.query).to_model(depth=1)
+        self.assertTrue(any(atom.predicate_name == "truncated" for atom in graph))
+        self.assertIsNone(self.assert_round_trip(graph))
+
+    def test_incomplete(self):
+        """
+        Test that the reason of an interrupted explanation is kept.
+        """
+        graph = Model.of_elements(
+            [*self.graph, GroundAtom.parse("incomplete(derivation)")], sort=False
+        )
+        self.assertEqual(self.assert_round_trip(graph), "derivation")
+        with load_graph_binary(self.file_name) as loaded:
+            self.assertEqual(incomplete(loaded.to_model()), "derivation")
+
+    def test_empty(self):
+        """
+        Test a graph without nodes and links.
+        """
+        save_graph_binary([], self.file_name)
+        with load_graph_binary(self.file_name) as graph:
+            self.assertEqual(graph.number_of_strings, 0)
+            self.assertEqual(list(graph.to_model()), [])
+
+    def test_invalid(self):
+        """
+        Test that files of other formats are rejected.
+        """
+        with open(self.file_name, "wb") as f:
+            f.write(b"node(a,true,(support,)).\n" * 4)
+        with self.assertRaises(ValueError):
+            load_graph_binary(self.file_name)
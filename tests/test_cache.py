@@ -0,0 +1,101 @@
+"""
+Test the on-disk caches.
+"""
+
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+from ucorexplain import cache, herbrand_base_of, parse_model
+from ucorexplain.cache import ExplanationCache, GroundProgramCache, HerbrandBaseCache
+
+
+class TestCache(unittest.TestCase):
+    """
+    Test the keys and entries of the caches.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(cache._versions.cache_clear)  # pylint: disable=protected-access
+
+    def explanation_key(self) -> str:
+        """
+        Return the key of a small explanation.
+        """
+        atoms = parse_model("p(a).", "atoms")
+        return ExplanationCache.key("p(a).", atoms, atoms, atoms, list(atoms))
+
+    def test_round_trip(self):
+        """
+        Test that stored graphs are read back in the same order.
+        """
+        explanation_cache = ExplanationCache(self.directory)
+        graph = parse_model(
+            'node("b",true,(support,)). node("a",false,(assumption,)).', "graph"
+        )
+        key = self.explanation_key()
+        self.assertIsNone(explanation_cache.get(key))
+        explanation_cache.put(key, graph)
+        self.assertEqual(
+            [str(atom) for atom in explanation_cache.get(key)],
+            [str(atom) for atom in graph],
+        )
+
+    def test_versions(self):
+        """
+        Test that keys change with the format version and with the versions of the packages.
+        """
+        key = self.explanation_key()
+        ground_program_key = GroundProgramCache.key("p(a).", [])
+        cache._versions.cache_clear()  # pylint: disable=protected-access
+        with mock.patch.object(cache, "FORMAT_VERSION", cache.FORMAT_VERSION + 1):
+            self.assertNotEqual(self.explanation_key(), key)
+            self.assertNotEqual(GroundProgramCache.key("p(a).", []), ground_program_key)
+        cache._versions.cache_clear()  # pylint: disable=protected-access
+        with mock.patch.object(cache, "version", lambda package: "0.0.0"):
+            self.assertNotEqual(self.explanation_key(), key)
+        cache._versions.cache_clear()  # pylint: disable=protected-access
+        self.assertEqual(self.explanation_key(), key)
+
+    def test_arguments(self):
+        """
+        Test that keys change with the clingo arguments, which can change grounding.
+        """
+        atoms = parse_model("p(a).", "atoms")
+        keys = [
+            (
+                HerbrandBaseCache.key("p(a).", atoms, atoms, atoms, (), arguments),
+                ExplanationCache.key("p(a).", atoms, atoms, atoms, [], arguments),
+                GroundProgramCache.key("p(a).", [], arguments),
+            )
+            for arguments in ((), ["--const=n=2"], ["--const=n=3"])
+        ]
+        for index, key in enumerate(keys):
+            for other in keys[index + 1 :]:
+                self.assertTrue(all(a != b for a, b in zip(key, other)))
+        self.assertNotEqual(
+            HerbrandBaseCache.key("p(a).", atoms, atoms, atoms, ["p"]),
+            HerbrandBaseCache.key("p(a).", atoms, atoms, atoms, (), ["p"]),
+        )
+        program = SymbolicProgram.parse("p(1..n).")
+        herbrand_base_cache = HerbrandBaseCache(self.directory)
+        empty = parse_model("", "atoms")
+        sizes = [
+            len(
+                herbrand_base_of(
+                    program,
+                    empty,
+                    empty,
+                    empty,
+                    cache=herbrand_base_cache,
+                    arguments=[f"--const=n={n}"],
+                )
+            )
+            for n in (2, 3)
+        ]
+        self.assertEqual(sizes, [2, 3])
@@ -0,0 +1,238 @@
+"""
+Test the incremental Explainer against dumbo_asp.queries.explanation_graph.
+"""
+
+import itertools
+import time
+import unittest
+from unittest import mock
+
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.queries import explanation_graph
+
+from ucorexplain import herbrand_base_of, parse_model, program_from_files, solve
+from ucorexplain.explainer import Explainer, _solve
+from ucorexplain.explanation import incomplete
+
+EMPTY = Model.of_atoms()
+
+
+def reference(program, answer_set, herbrand_base, query):
+    """
+    Return the atoms of the graph computed by dumbo_asp.
+    """
+    return {
+        str(atom)
+        for atom in explanation_graph(
+            program=program,
+            answer_set=answer_set,
+            herbrand_base=herbrand_base,
+            query=query,
+        )
+    }
+
+
+def interrupting(**calls):
+    """
+    Return a replacement of _solve interrupting every call of a step after the given number of calls.
+    """
+    done = {step: 0 for step in calls}
+
+    def run(control, deadline, step, *args, **kwargs):
+        if step in calls:
+            done[step] += 1
+            if done[step] > calls[step]:
+                return None
+        return _solve(control, deadline, step, *args, **kwargs)
+
+    return run
+
+
+def atoms(graph):
+    """
+    Return the atoms of a graph as strings.
+    """
+    return {str(atom) for atom in graph}
+
+
+class TestExplainer(unittest.TestCase):
+    """
+    Test that the Explainer computes the graphs of explanation_graph.
+    """
+
+    def assert_fresh(self, program, answer_set, query, false_atoms=EMPTY):
+        """
+        Compare the graph of a new Explainer of the query with the one of explanation_graph.
+        """
+        herbrand_base = herbrand_base_of(program, answer_set, query, false_atoms)
+        self.assertEqual(
+            atoms(Explainer(program, herbrand_base).explain(answer_set, query)),
+            reference(program, answer_set, herbrand_base, query),
+        )
+
+    def assert_reused(self, program, answer_sets, queries):
+        """
+        Compare the graphs of one Explainer for every answer set and query with the ones of explanation_graph.
+        """
+        herbrand_base = herbrand_base_of(program, Model.of_atoms(), EMPTY, EMPTY)
+        explainer = Explainer(program, herbrand_base)
+        for answer_set in answer_sets:
+            for query in queries:
+                with self.subTest(answer_set=str(answer_set), query=str(query)):
+                    self.assertEqual(
+                        atoms(explainer.explain(answer_set, query)),
+                        reference(program, answer_set, herbrand_base, query),
+                    )
+
+    def test_paper(self):
+        """
+        Test the examples of the paper.
+        """
+        self.assert_fresh(
+            program_from_files(["examples/paper/example5.lp"]),
+            parse_model("s(a,b). s(b,a). p(a). r(a).", "answer set"),
+            parse_model("p(a).", "query"),
+        )
+        self.assert_fresh(
+            program_from_files(["examples/paper/example8.lp"]),
+            EMPTY,
+            parse_model("r.", "query"),
+            parse_model("p.", "false atoms"),
+        )
+
+    def test_basic(self):
+        """
+        Test every atom of the Herbrand base of the basic examples.
+        """
+        for name, skipped in (
+            ("last_supoprt", ()),
+            ("loop", ("c",)),  # explanation_graph fails on c
+            ("removed_ground", ()),
+            ("small", ()),
+            ("small_neg", ()),
+            ("support", ()),
+            ("support_var", ()),
+        ):
+            program = program_from_files([f"examples/basic/{name}.lp"])
+            answer_set, herbrand_base = solve(program)
+            for atom in herbrand_base:
+                if str(atom) not in skipped:
+                    with self.subTest(example=name, atom=str(atom)):
+                        self.assert_fresh(program, answer_set, Model.of_atoms(atom))
+
+    def test_sudoku(self):
+        """
+        Test true and false cells of the 4x4 Sudoku, with a new Explainer for each and with one for all.
+        """
+        program = program_from_files(
+            ["examples/sudoku/encoding4x4.lp", "examples/sudoku/instance4x4.lp"]
+        )
+        answer_set, _ = solve(program)
+        queries = [
+            parse_model("assign((1,2),2).", "query"),
+            parse_model("assign((3,3),2).", "query"),
+            parse_model("assign((1,2),1).", "query"),
+        ]
+        self.assert_fresh(program, answer_set, queries[0])
+        self.assert_reused(program, [answer_set], queries)
+
+    def test_answer_sets(self):
+        """
+        Test one Explainer over several answer sets, whose atoms are reassigned between calls.
+        """
+        program = SymbolicProgram.parse("""
+            {a; b}.
+            c :- a, not b.
+            d :- not c.
+            """)
+        answer_sets = [
+            parse_model(facts, "answer set") for facts in ("a. c.", "a. b. d.", "d.")
+        ]
+        queries = [parse_model(facts, "query") for facts in ("c.", "d.")]
+        self.assert_reused(program, answer_sets, queries)
+
+    def test_interrupted(self):
+        """
+        Test that an interrupted explanation shows the nodes and links derived so far.
+        """
+        program = program_from_files(
+            ["examples/sudoku/encoding4x4.lp", "examples/sudoku/instance4x4.lp"]
+        )
+        answer_set, _ = solve(program)
+        query = parse_model("assign((1,2),2).", "query")
+        herbrand_base = herbrand_base_of(program, answer_set, query, EMPTY)
+        for calls, reason in (
+            ({"derivation": 4}, "derivation"),
+            ({"pus": 1, "derivation": 4}, "pus"),
+        ):
+            with self.subTest(reason=reason):
+                with mock.patch("ucorexplain.explainer._solve", interrupting(**calls)):
+                    graph = Explainer(program, herbrand_base).explain(answer_set, query)
+                predicates = {atom.predicate_name for atom in graph}
+                self.assertIn(f"incomplete({reason})", atoms(graph))
+                self.assertIn("node", predicates)
+                self.assertIn("link", predicates)
+
+    def test_ground_program(self):
+        """
+        Test that an Explainer built from the ground program of another computes the same graphs.
+        """
+        program = program_from_files(
+            ["examples/sudoku/encoding4x4.lp", "examples/sudoku/instance4x4.lp"]
+        )
+        answer_set, _ = solve(program)
+        herbrand_base = herbrand_base_of(program, answer_set, EMPTY, EMPTY)
+        fresh = Explainer(program, herbrand_base)
+        rebuilt = Explainer(program, herbrand_base, ground_program=fresh.ground_program)
+        for facts in ("assign((1,2),2).", "assign((3,3),2).", "assign((1,2),1)."):
+            query = parse_model(facts, "query")
+            with self.subTest(query=facts):
+                self.assertEqual(
+                    atoms(rebuilt.explain(answer_set, query)),
+                    atoms(fresh.explain(answer_set, query)),
+                )
+
+    def test_timeout(self):
+        """
+        Test real deadlines, with a clock advancing by a second at each reading.
+
+        The nodes of an incomplete graph agree with the answer set, and with the complete graph on the atoms
+        both have: an interrupted derivation also shows atoms that the query turns out not to depend on.
+        """
+        program = program_from_files(
+            ["examples/sudoku/encoding4x4.lp", "examples/sudoku/instance4x4.lp"]
+        )
+        answer_set, _ = solve(program)
+        query = parse_model("assign((1,2),2).", "query")
+        herbrand_base = herbrand_base_of(program, answer_set, query, EMPTY)
+        explainer = Explainer(program, herbrand_base)
+        complete = {
+            atom.arguments[0]: atom
+            for atom in explainer.explain(answer_set, query)
+            if atom.predicate_name == "node"
+        }
+        true_atoms = {str(atom) for atom in answer_set}
+        reasons = set()
+        for timeout in range(1, 20, 3):
+            with mock.patch.object(time, "monotonic", itertools.count().__next__):
+                graph = explainer.explain(answer_set, query, timeout=timeout)
+            reason = incomplete(graph)
+            if reason is None:
+                continue
+            reasons.add(reason)
+            nodes = [
+                atom
+                for atom in graph
+                if atom.predicate_name == "node" and atom.arguments[0].string != "None"
+            ]
+            with self.subTest(timeout=timeout, reason=reason):
+                if reason != "unsat":
+                    self.assertTrue(nodes)
+                if reason == "derivation":
+                    self.assertIn("link", {atom.predicate_name for atom in graph})
+                for node in nodes:
+                    name, value = node.arguments[0].string, node.arguments[1].name
+                    self.assertEqual(value == "true", name in true_atoms)
+                    self.assertEqual(complete.get(node.arguments[0], node), node)
+        self.assertEqual(reasons, {"unsat", "pus", "derivation"})
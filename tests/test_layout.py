@@ -0,0 +1,67 @@
+"""
+Test the clingraph rendering of explanation graphs.
+"""
+
+import os
+import re
+import unittest
+
+from clingo import Control
+from clingraph.clingo_utils import ClingraphContext
+from clingraph.graphviz import compute_graphs
+from clingraph.orm import Factbase
+
+from ucorexplain import (
+    ENCODINGS_PATH,
+    herbrand_base_of,
+    parse_model,
+    program_from_files,
+)
+from ucorexplain.explainer import Explainer
+from ucorexplain.utils.layout import layout_facts
+
+EVENTS = ("click", "mouseenter", "mouseleave")
+
+
+def graphviz_source(graph, tree: bool) -> str:
+    """
+    Return the graphviz source drawn by visualize for the graph.
+    """
+    factbase = Factbase(prefix="viz_")
+    control = Control(["--warn=none"])
+    control.add("base", [], layout_facts(graph, tree))
+    encoding = "clingraph_tree.lp" if tree else "clingraph_simple.lp"
+    control.load(os.path.join(ENCODINGS_PATH, encoding))
+    control.ground([("base", [])], context=ClingraphContext())
+    control.solve(on_model=factbase.add_model)
+    return compute_graphs(factbase, graphviz_type="digraph")["default"].source
+
+
+class TestLayout(unittest.TestCase):
+    """
+    Test the SVG interaction of the rendered graphs.
+    """
+
+    def test_svg_ids(self):
+        """
+        Test that every element referenced by an SVG event is the id of an element, in graphs and trees.
+        """
+        program = program_from_files(["examples/paper/example5.lp"])
+        answer_set = parse_model("s(a,b). s(b,a). p(a). r(a).", "answer set")
+        query = parse_model("p(a).", "query")
+        herbrand_base = herbrand_base_of(
+            program, answer_set, query, parse_model("", "false atoms")
+        )
+        graph = Explainer(program, herbrand_base).explain(answer_set, query)
+        for tree in (False, True):
+            with self.subTest(tree=tree):
+                source = graphviz_source(graph, tree)
+                ids = set(re.findall(r'\bid="([^"]*)"', source))
+                referenced = {
+                    token.split("___")[1]
+                    for classes in re.findall(r'\bclass="([^"]*)"', source)
+                    for token in classes.split()
+                    if token.split("___")[0] in EVENTS
+                }
+                self.assertTrue(referenced)
+                self.assertLessEqual(referenced, ids)
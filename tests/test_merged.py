@@ -0,0 +1,81 @@
+"""
+Test the merge of explanation graphs.
+"""
+
+import unittest
+
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+from ucorexplain import parse_model, program_from_files, solve
+from ucorexplain.merged import MergedGraph, explain_all, select_atoms
+
+
+def graph(*atoms):
+    """
+    Return the atoms of a graph, parsed from strings.
+    """
+    return [GroundAtom.parse(atom) for atom in atoms]
+
+
+def orphans(model, queries):
+    """
+    Return the nodes of the model that are neither a query nor the target of a link.
+    """
+    targets = {
+        str(atom.arguments[1]) for atom in model if atom.predicate_name == "link"
+    }
+    names = {f'"{atom}"' for atom in queries}
+    return [
+        str(atom.arguments[0])
+        for atom in model
+        if atom.predicate_name == "node"
+        and str(atom.arguments[0]) not in targets | names
+    ]
+
+
+class TestMergedGraph(unittest.TestCase):
+    """
+    Test that merged graphs have one node per atom, all reachable from the queries.
+    """
+
+    def test_kept_node(self):
+        """
+        Test that the reasons of a node already in the merged graph are not added again.
+        """
+        merged = MergedGraph()
+        merged.add(
+            graph(
+                'node("a",true,(support,"a :- b."))',
+                'link("a","b","a :- b.")',
+                'node("b",true,(support,"b."))',
+            ),
+            parse_model("a.", "query"),
+        )
+        merged.add(
+            graph(
+                'node("c",true,(support,"c :- b."))',
+                'link("c","b","c :- b.")',
+                'node("b",true,(support,"b :- d."))',
+                'link("b","d","b :- d.")',
+                'node("d",true,(support,"d."))',
+            ),
+            parse_model("c.", "query"),
+        )
+        model = merged.to_model()
+        self.assertEqual(len(merged), 3)
+        self.assertIn(GroundAtom.parse('node("b",true,(support,"b."))'), model)
+        self.assertNotIn(GroundAtom.parse('link("b","d","b :- d.")'), model)
+
+    def test_sudoku(self):
+        """
+        Test that no node of the merged graph of the 4x4 Sudoku is unreachable from the queries.
+        """
+        program = program_from_files(
+            ["examples/sudoku/encoding4x4.lp", "examples/sudoku/instance4x4.lp"]
+        )
+        answer_set, _ = solve(program)
+        atoms = list(select_atoms(answer_set, ["assign/2"]))
+        merged = explain_all(program, answer_set, atoms, Model.of_atoms())
+        self.assertTrue(merged.reused)
+        self.assertEqual(orphans(merged.to_model(), atoms), [])
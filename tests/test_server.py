@@ -0,0 +1,87 @@
+"""
+Test the resident explanation server.
+"""
+
+import io
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+from ucorexplain import program_from_files
+from ucorexplain.server import ExplanationServer, is_stale_socket
+
+GRAPH = [
+    'node("p(a)",true,(support,"p(a) :- r(a)."))',
+    'link("p(a)","r(a)","p(a) :- r(a).")',
+    'node("r(a)",true,(assumption,))',
+]
+REQUEST = {"query": "p(a).", "answer": "s(a,b). s(b,a). p(a). r(a).", "depth": 1}
+
+
+def graph(*atoms):
+    """
+    Return a model of the atoms, parsed from strings.
+    """
+    return Model.of_elements([GroundAtom.parse(atom) for atom in atoms], sort=False)
+
+
+class TestExplanationServer(unittest.TestCase):
+    """
+    Test the requests answered by the server.
+    """
+
+    def setUp(self):
+        self.server = ExplanationServer(
+            program_from_files(["examples/paper/example5.lp"])
+        )
+        self.addCleanup(self.server.close)
+
+    def test_reused_graph(self):
+        """
+        Test that the graph of a request is reused by a later expansion, unless it is incomplete.
+        """
+        for atoms, calls in ((GRAPH, 1), ([*GRAPH, "incomplete(derivation)"], 2)):
+            with self.subTest(calls=calls):
+                self.server._graphs.clear()  # pylint: disable=protected-access
+                with mock.patch.object(
+                    self.server, "explain", return_value=graph(*atoms)
+                ) as explain:
+                    self.server.explanation(REQUEST)
+                    self.server.explanation({**REQUEST, "expand": ["r(a)"]})
+                self.assertEqual(explain.call_count, calls)
+
+    def test_socket_path(self):
+        """
+        Test that only a socket is replaced at the path of the socket.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "server.sock")
+        self.assertFalse(is_stale_socket(path))
+        with socket.socket(socket.AF_UNIX) as stale:
+            stale.bind(path)
+        self.assertTrue(is_stale_socket(path))
+        os.unlink(path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("not a socket")
+        with self.assertRaises(FileExistsError):
+            self.server.serve_unix_socket(path)
+        self.assertTrue(os.path.isfile(path))
+
+    def test_stream(self):
+        """
+        Test that every request of a stream is answered, and blank lines are skipped.
+        """
+        lines = [json.dumps({"id": index}) for index in range(50)]
+        outstream = io.StringIO()
+        with mock.patch.object(self.server, "handle", side_effect=json.loads):
+            self.server.serve_stream(io.StringIO("\n".join(lines) + "\n\n"), outstream)
+        responses = [json.loads(line) for line in outstream.getvalue().splitlines()]
+        self.assertCountEqual(responses, [{"id": index} for index in range(50)])
@@ -0,0 +1,123 @@
+"""
+Test the streaming readers of ground atoms.
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from ucorexplain.utils import stream
+from ucorexplain.utils.stream import read_clingo_json, read_facts, read_model
+
+FACTS = """
+% a comment with a dot. and a "quote
+p(1). q("a. b", "%not a comment").
+%* a block
+comment. *% r(f(x),-2).
+s("escaped \\" quote.").
+"""
+
+WITNESSES = [["p(1)", 'q("a.b")'], ["p(2)"], ["p(3)", 'q("%c")']]
+
+
+def clingo_json(witnesses):
+    """
+    Return an output of clingo --outf=2 with the given witnesses.
+    """
+    return json.dumps(
+        {
+            "Solver": "clingo version 5.8.0",
+            "Input": ["program.lp"],
+            "Call": [{"Witnesses": [{"Value": value} for value in witnesses]}],
+            "Result": "SATISFIABLE",
+            "Models": {"Number": len(witnesses), "More": "no"},
+        },
+        indent=2,
+    )
+
+
+def strings(symbols):
+    """
+    Return the symbols as strings.
+    """
+    return [str(symbol) for symbol in symbols]
+
+
+class TestStream(unittest.TestCase):
+    """
+    Test reading facts and clingo JSON output.
+    """
+
+    def setUp(self):
+        # small chunks, so that tokens are split across chunks
+        patcher = mock.patch.object(stream, "CHUNK_SIZE", 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_facts(self):
+        """
+        Test facts with strings containing '.' and '%', and comments.
+        """
+        self.assertEqual(
+            strings(read_facts(io.StringIO(FACTS))),
+            [
+                "p(1)",
+                'q("a. b","%not a comment")',
+                "r(f(x),-2)",
+                's("escaped \\" quote.")',
+            ],
+        )
+
+    def test_facts_errors(self):
+        """
+        Test that malformed facts are rejected.
+        """
+        for text in ("p(1). q(2)", "p(1) q(2).", "1."):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                list(read_facts(io.StringIO(text)))
+
+    def test_json_witness(self):
+        """
+        Test that the last witness is selected by default, or the given one.
+        """
+        text = clingo_json(WITNESSES)
+        self.assertEqual(strings(read_clingo_json(io.StringIO(text))), WITNESSES[-1])
+        for witness, value in enumerate(WITNESSES, start=1):
+            with self.subTest(witness=witness):
+                self.assertEqual(
+                    strings(read_clingo_json(io.StringIO(text), witness)), value
+                )
+        with self.assertRaisesRegex(ValueError, "only 3 witnesses"):
+            read_clingo_json(io.StringIO(text), 4)
+        with self.assertRaisesRegex(ValueError, "no witness"):
+            read_clingo_json(io.StringIO(clingo_json([])))
+
+    def test_read_model(self):
+        """
+        Test recognizing the format from the extension or the content, and reading stdin.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        expected = sorted(WITNESSES[1])
+        for name, text in (
+            ("answer.json", clingo_json(WITNESSES)),
+            ("answer.txt", clingo_json(WITNESSES)),
+            ("answer.lp", "p(2)."),
+        ):
+            file_name = os.path.join(directory, name)
+            with open(file_name, "w", encoding="utf-8") as f:
+                f.write(text)
+            with self.subTest(file=name):
+                self.assertEqual(strings(read_model(file_name, witness=2)), expected)
+        with mock.patch.object(
+            sys, "stdin", io.StringIO("\n\n" + clingo_json(WITNESSES))
+        ):
+            self.assertEqual(strings(read_model("-", witness=2)), expected)
+        with mock.patch.object(sys, "stdin", io.StringIO('{"Value": ["p(2)"]}')):
+            with self.assertRaises(ValueError):
+                read_model("-", input_format="facts")
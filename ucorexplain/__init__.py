@@ -2,25 +2,29 @@
 UCOREXPLAIN
 """
 
-from typing import Final, Optional, Sequence, Union
+from typing import Callable, Final, Optional, Sequence, Union
 
 import clingo
-import typeguard
 from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
 from dumbo_asp.primitives.models import Model
-from dumbo_asp.primitives.predicates import Predicate
 from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.rules import SymbolicRule
 from dumbo_utils.console import console
 import base64
+import functools
 
 import os
+import subprocess
 from clingo import Control
-from clingo.script import enable_python
-from clingraph.clingo_utils import ClingraphContext  # type: ignore
-from clingraph.graphviz import compute_graphs, render  # type: ignore
-from clingraph.orm import Factbase  # type: ignore
-from clingraph.clingo_utils import add_svg_interaction, add_elements_ids
+
+# clingraph, graphviz and the explainer (which needs dumbo_asp.queries) are imported when used,
+# since they take most of the startup time of the command line
+from .explanation import incomplete
+from .utils import binary_graph, reorder
+from .utils.control import control_arguments
+from .utils.layout import chop_rule, layout_facts
+from .utils.profile import stage
+from .utils.transformer import HERBRAND_BASE_SIGNATURE, HerbrandBaseTransformer
 
 AnswerSetElement = Union[GroundAtom, tuple[GroundAtom, bool]]
 AnswerSet = tuple[AnswerSetElement, ...]
@@ -61,83 +65,415 @@ def print_with_title(title, value, quiet=False):
     console.print(f"[bold red]-------------[/bold red]")
 
 
-ENCODINGS_PATH = os.path.join(".", os.path.join("ucorexplain", "encodings"))
+def parse_model(facts: str, what: str) -> Model:
+    try:
+        return Model.of_program(facts)
+    except Exception as e:
+        print_error(f"The {what} should be presented a facts with '.'")
+        raise e
+
+
+def compute_herbrand_base(
+    program: SymbolicProgram, *models: Model, arguments: Sequence[str] = ()
+) -> Model:
+    """
+    Compute the Herbrand base of the program extended with the atoms of the given models as facts.
+
+    Same as SymbolicProgram.herbrand_base, but the atoms are passed to clingo as symbols through the backend
+    instead of being printed as facts and parsed again. The clingo arguments are passed to the control.
+    """
+    control = clingo.Control(control_arguments([], arguments))
+    control.add(
+        "base",
+        [],
+        "\n".join(
+            f"{atom} :- {rule.body_as_string(drop_negative_literals=True)}."
+            for rule in program
+            for atom in rule.head_elements
+        ),
+    )
+    with control.backend() as backend:
+        for model in models:
+            for atom in model:
+                backend.add_rule([backend.add_atom(atom.value)])
+    control.ground([("base", [])])
+    return Model.of_atoms(atom.symbol for atom in control.symbolic_atoms)
+
+
+def solve(
+    program: SymbolicProgram,
+    select: Union[int, Callable[[clingo.Model], bool]] = 1,
+    *models: Model,
+    arguments: Sequence[str] = (),
+) -> tuple[Model, Model]:
+    """
+    Compute an answer set of the program and its Herbrand base (extended with the atoms of the given models)
+    from a single grounding.
+
+    The answer set is the select-th one (starting from 1), or the first one for which select returns True.
+    The Herbrand base is grounded as a copy of the program built by HerbrandBaseTransformer.
+    The clingo arguments are passed to the control.
+    """
+    control = clingo.Control(control_arguments(["0", "--warn=none"], arguments))
+    program_string = str(program)
+    control.add("base", [], program_string)
+    control.add("base", [], HerbrandBaseTransformer().get_transformed(program_string))
+    with control.backend() as backend:
+        for model in models:
+            for atom in model:
+                symbol = clingo.Function(HERBRAND_BASE_SIGNATURE, [atom.value])
+                backend.add_rule([backend.add_atom(symbol)])
+    control.ground([("base", [])])
+    herbrand_base = Model.of_atoms(
+        atom.symbol.arguments[0]
+        for atom in control.symbolic_atoms.by_signature(HERBRAND_BASE_SIGNATURE, 1)
+    )
+
+    with control.solve(yield_=True) as handle:
+        for index, model in enumerate(handle, start=1):
+            if select(model) if callable(select) else index == select:
+                answer_set = Model.of_atoms(
+                    symbol
+                    for symbol in model.symbols(shown=True)
+                    if symbol.type == clingo.SymbolType.Function
+                    and not symbol.match(HERBRAND_BASE_SIGNATURE, 1)
+                )
+                return answer_set, herbrand_base
+    raise ValueError("no answer set of the program was selected")
+
+
+def herbrand_base_of(
+    program: SymbolicProgram,
+    answer_set: Model,
+    query: Model,
+    explicitly_mentioned_atoms: Model,
+    move_before: Sequence[str] = (),
+    cache=None,
+    arguments: Sequence[str] = (),
+) -> tuple[GroundAtom, ...]:
+    """
+    Compute the Herbrand base used to explain the query, reordered by the given patterns.
+
+    If a HerbrandBaseCache is given, the result is looked up there first and stored after being computed.
+    The clingo arguments are passed to the control grounding the program.
+    """
+    if cache is not None:
+        key = cache.key(
+            program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            move_before,
+            arguments,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    with stage("herbrand base"):
+        base = compute_herbrand_base(
+            program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            arguments=arguments,
+        )
+
+    # Move atoms
+    with stage("move_before"):
+        result = reorder.move_before(base, move_before)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def cached_explanation(
+    cache,
+    program: SymbolicProgram,
+    answer_set: Model,
+    query: Model,
+    explicitly_mentioned_atoms: Model,
+    herbrand_base: Sequence[GroundAtom],
+    compute: Callable[[], Model],
+    arguments: Sequence[str] = (),
+) -> Model:
+    """
+    Return the graph computed by compute(), looking it up first in the given ExplanationCache, if any.
+
+    The clingo arguments given to compute() are part of the key. Graphs whose computation was interrupted are
+    not stored.
+    """
+    if cache is None:
+        return compute()
+    key = cache.key(
+        program,
+        answer_set,
+        query,
+        explicitly_mentioned_atoms,
+        herbrand_base,
+        arguments,
+    )
+    with stage("explanation cache"):
+        graph = cache.get(key)
+    if graph is not None:
+        return graph
+    graph = compute()
+    if incomplete(graph) is None:
+        with stage("explanation cache"):
+            cache.put(key, graph)
+    return graph
+
+
+def explainer_of(
+    program: SymbolicProgram,
+    herbrand_base,
+    cache=None,
+    arguments: Sequence[str] = (),
+):
+    """
+    Return an Explainer of the program on the Herbrand base, whose controls get the given clingo arguments.
+
+    If a GroundProgramCache is given, the ground program with selectors is read from there instead of being
+    expanded and grounded again, and stored after being computed.
+    """
+    from .explainer import Explainer
+
+    if cache is None:
+        with stage("explainer setup"):
+            return Explainer(program, herbrand_base, arguments=arguments)
+    key = cache.key(program, herbrand_base, arguments)
+    with stage("ground program cache"):
+        ground_program = cache.get(key)
+    with stage("explainer setup"):
+        explainer = Explainer(
+            program, herbrand_base, ground_program, arguments=arguments
+        )
+    if ground_program is None:
+        with stage("ground program cache"):
+            cache.put(key, explainer.ground_program)
+    return explainer
+
+
+def read_queries(lines) -> list[Model]:
+    """
+    Read one query per line, skipping empty lines and comments.
+    """
+    queries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("%"):
+            continue
+        queries.append(parse_model(line, "query"))
+    return queries
 
 
-def visualize(file_path, tree=False) -> None:
+def explain_batch(
+    program: SymbolicProgram,
+    answer_set: Model,
+    queries: Sequence[Model],
+    explicitly_mentioned_atoms: Model,
+    move_before: Sequence[str] = (),
+    cache=None,
+    explanation_cache=None,
+    timeout: Optional[float] = None,
+    ground_program_cache=None,
+    arguments: Sequence[str] = (),
+    herbrand_base: Optional[Sequence[GroundAtom]] = None,
+):
+    """
+    Explain each query in turn, yielding pairs (query, graph).
+
+    The Herbrand base and the ground program with selectors are computed once for all queries whose atoms
+    are already part of it; only queries mentioning new atoms pay for their own grounding.
+    Graphs found in the explanation cache are not computed again, and neither are ground programs found in
+    the ground program cache.
+    Each query is given at most timeout seconds of solving, as in Explainer.explain, and the clingo
+    arguments are passed to every control.
+    The Herbrand base of the program, answer set and false atoms (ordered by move_before) is computed unless
+    given, e.g., as returned by solve.
+    """
+    if herbrand_base is None:
+        herbrand_base = herbrand_base_of(
+            program,
+            answer_set,
+            Model.of_atoms(),
+            explicitly_mentioned_atoms,
+            move_before,
+            cache,
+            arguments,
+        )
+    known_atoms = set(herbrand_base)
+    explainer = None
+
+    def compute(query, query_herbrand_base):
+        nonlocal explainer
+        if query_herbrand_base is herbrand_base:
+            # built on the first cache miss, and shared by all queries on this Herbrand base
+            if explainer is None:
+                explainer = explainer_of(
+                    program, herbrand_base, ground_program_cache, arguments
+                )
+            query_explainer = explainer
+        else:
+            query_explainer = explainer_of(
+                program, query_herbrand_base, ground_program_cache, arguments
+            )
+        with stage("explanation graph"):
+            return query_explainer.explain(answer_set, query, timeout=timeout)
+
+    for query in queries:
+        query_herbrand_base = herbrand_base
+        if any(atom not in known_atoms for atom in query):
+            query_herbrand_base = herbrand_base_of(
+                program,
+                answer_set,
+                query,
+                explicitly_mentioned_atoms,
+                move_before,
+                cache,
+                arguments,
+            )
+        graph = cached_explanation(
+            explanation_cache,
+            program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            query_herbrand_base,
+            functools.partial(compute, query, query_herbrand_base),
+            arguments,
+        )
+        yield query, graph
+
+
+ENCODINGS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "encodings")
+
+
+def render_once(graph, directory="out", formats=("png", "svg"), engine="dot"):
+    """
+    Render a graphviz graph in several formats with a single run of the layout engine.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {fmt: os.path.join(directory, f"{graph.name}.{fmt}") for fmt in formats}
+    command = [engine]
+    for fmt, file_path in paths.items():
+        command.extend([f"-T{fmt}", "-o", file_path])
+    subprocess.run(command, input=graph.source.encode(), check=True)
+    return paths
+
+
+def visualize(graph, tree=False, formats=("png", "svg"), view=True, arguments=()):
+    """
+    Render the graph with clingraph; the graph is either a model or a file written by save_graph.
+
+    The structure of the graph is computed by ucorexplain.utils.layout and passed to clingo in memory,
+    so that the encodings only style it; all formats share one layout. The clingo arguments are passed to
+    the control.
+    """
+    import graphviz  # type: ignore
+    from clingraph.clingo_utils import (  # type: ignore
+        ClingraphContext,
+        add_svg_interaction,
+    )
+    from clingraph.graphviz import compute_graphs  # type: ignore
+    from clingraph.orm import Factbase  # type: ignore
+
     fb = Factbase(prefix="viz_")
-    ctl = Control(["--warn=none"])
+    ctl = Control(control_arguments(["--warn=none"], arguments))
     ctx = ClingraphContext()
-    add_elements_ids(ctl)
-    ctl.load(file_path)
+    with stage("layout"):
+        ctl.add("base", [], layout_facts(graph, tree))
     if tree:
         ctl.load(os.path.join(ENCODINGS_PATH, "clingraph_tree.lp"))
     else:
         ctl.load(os.path.join(ENCODINGS_PATH, "clingraph_simple.lp"))
-    enable_python()
-
-    ctl.ground([("base", [])], context=ctx)
-    ctl.solve(on_model=fb.add_model)
-    graphs = compute_graphs(fb, graphviz_type="digraph")
-    path_png = render(graphs, format="png")
-    print("PNG Image saved in: " + path_png["default"])
-    paths = render(graphs, view=True, format="svg")
-    add_svg_interaction([paths])
-    print(
-        "SVG Image saved in: "
-        + paths["default"]
-        + "      Click on the nodes to expand! If your browser is opening empty, you might have to scroll to the side to find the first node"
-    )
+
+    with stage("clingraph"):
+        ctl.ground([("base", [])], context=ctx)
+        ctl.solve(on_model=fb.add_model)
+        graphs = compute_graphs(fb, graphviz_type="digraph")
+    with stage("render"):
+        paths = render_once(graphs["default"], formats=formats)
+    for fmt, file_path in paths.items():
+        if fmt == "svg":
+            add_svg_interaction([{"default": file_path}])
+            print(
+                "SVG Image saved in: "
+                + file_path
+                + "      Click on the nodes to expand! If your browser is opening empty, "
+                "you might have to scroll to the side to find the first node"
+            )
+        else:
+            print(f"{fmt.upper()} Image saved in: {file_path}")
+    if view and "svg" in paths:
+        graphviz.view(paths["svg"])
     return fb
 
 
 def ruleto64(rule_str):
     s = str(rule_str).strip('"')
-    r = SymbolicRule.parse(s)
-    r = r.with_chopped_body(
-        with_backward_search=True, backward_search_symbols=(";", " :-")
-    )
-    encoded = base64.b64encode(str(r).encode("ascii"))
+    encoded = base64.b64encode(chop_rule(s).encode("ascii"))
     return encoded
 
 
-def save_graph(graph):
-    with open("graph.lp", "wb") as file_to_save:
-        for a in graph:
+def graph_facts(graph) -> str:
+    """
+    Encode the graph as facts node/3 and link/3 referring to the base64 rules of a shared table rule/2.
+
+    Each distinct rule is chopped and encoded once, whatever the number of nodes and links using it.
+    Nodes with hidden reasons (see ucorexplain.explanation) are listed in truncated/2, and
+    an interrupted computation is recorded in incomplete/1.
+    """
+    rule_ids: dict[str, int] = {}
+    out: list[str] = []
+
+    def rule_id(rule) -> int:
+        key = str(rule)
+        if key not in rule_ids:
+            rule_ids[key] = len(rule_ids) + 1
+            out.append(f'rule({rule_ids[key]},"{ruleto64(key).decode()}").\n')
+        return rule_ids[key]
+
+    for a in graph:
+        if a.predicate_name == "incomplete":
+            out.append(f"incomplete({a.arguments[0]}).\n")
+        if a.predicate_name == "truncated":
+            name = str(a.arguments[0]).strip('"')
+            out.append(f"truncated({name}, {a.arguments[1]}).\n")
+        if a.predicate_name == "node":
+            if str(a.arguments[0]).strip('"') == "None":
+                continue
+            args = ",".join([str(a).strip('"') for a in a.arguments[:-1]])
+            t = a.arguments[-1].arguments
+            reason = str(t[0])
+            if len(t) > 1:
+                reason += f", {rule_id(t[1])}"
+                if len(t) == 3:
+                    reason += f",{t[2]}"
+            out.append(f"node({args}, ({reason})).\n")
+        if a.predicate_name == "link":
+            if str(a.arguments[1]).strip('"') == "None":
+                continue
+            args = ",".join([str(a).strip('"') for a in a.arguments[:-1]])
+            out.append(f"link({args}, {rule_id(a.arguments[-1])}).\n")
+    return "".join(out)
+
+
+def save_graph(graph, file_name="graph.lp"):
+    with stage("save graph"), open(file_name, "w") as file_to_save:
+        file_to_save.write(graph_facts(graph))
+
+
+def save_graph_binary(graph, file_name="graph.ucxg"):
+    """
+    Save the graph in the compact binary format of ucorexplain.utils.binary_graph.
+    """
+    with stage("save graph"):
+        binary_graph.dump(graph, file_name)
 
-            if a.predicate_name == "node":
-                if str(a.arguments[0]).strip('"') == "None":
-                    continue
-                file_to_save.write((a.predicate_name).encode())
-                file_to_save.write(
-                    "({}".format(
-                        ",".join([str(a).strip('"') for a in a.arguments[:-1]])
-                    ).encode()
-                )
-                t = a.arguments[-1].arguments
-                file_to_save.write(", (".encode())
-                file_to_save.write(str(t[0]).encode())
-                if len(t) > 1:
-                    file_to_save.write(', "'.encode())
-                    s = ruleto64(str(t[1]))
-                    file_to_save.write(s)
-                    file_to_save.write('"'.encode())
-                    if len(t) == 3:
-                        file_to_save.write(",".encode())
-                        file_to_save.write(str(t[2]).encode())
-                file_to_save.write(")".encode())
-            if a.predicate_name == "link":
-                if str(a.arguments[1]).strip('"') == "None":
-                    continue
-                file_to_save.write((a.predicate_name).encode())
-                file_to_save.write(
-                    "({}".format(
-                        ",".join([str(a).strip('"') for a in a.arguments[:-1]])
-                    ).encode()
-                )
-                s = ruleto64(str(a.arguments[-1]))
-                file_to_save.write(', "'.encode())
-                file_to_save.write(s)
-                file_to_save.write('"'.encode())
 
-            file_to_save.write(").\n".encode())
+def load_graph_binary(file_name="graph.ucxg") -> binary_graph.GraphFile:
+    """
+    Memory-map a graph saved with save_graph_binary; use to_model() to get its atoms.
+    """
+    return binary_graph.GraphFile(file_name)
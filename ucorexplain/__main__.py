@@ -2,23 +2,311 @@
 The main entry point for the application.
 """
 
+import contextlib
+import functools
+import logging
+import os
 import sys
 
-from dumbo_asp.primitives.programs import SymbolicProgram
 from dumbo_asp.primitives.models import Model
-from dumbo_asp.queries import explanation_graph, pack_xasp_navigator_url
-from dumbo_asp.primitives.atoms import SymbolicAtom, GroundAtom
 
 from ucorexplain import (
+    cached_explanation,
+    explain_batch,
+    explainer_of,
+    herbrand_base_of,
+    parse_model,
     print_with_title,
     program_from_files,
+    read_queries,
     visualize,
     save_graph,
-    print_error,
+    save_graph_binary,
+    solve,
 )
+from .cache import ExplanationCache, GroundProgramCache, HerbrandBaseCache
+from .explanation import incomplete
+from .utils.control import split_arguments
+from .utils.logger import setup_logger
 from .utils.parser import get_parser
+from .utils.profile import Profiler, stage
+from .utils.reorder import move_before
+from .utils.statistics import SolverStatistics
+from .utils.stream import read_model
 
 old_stdout = sys.stdout
+log = setup_logger("main", logging.INFO)
+
+
+def model_of(args, facts: str, file_name, what: str) -> Model:
+    """
+    Return the atoms given as facts on the command line, or read from file_name if given.
+    """
+    if file_name is None:
+        return parse_model(facts, what)
+    return read_model(file_name, args.input_format, args.witness)
+
+
+def herbrand_base_cache(args):
+    """
+    Return the Herbrand base cache selected on the command line, if any.
+    """
+    if args.no_cache:
+        return None
+    return HerbrandBaseCache(os.path.join(args.cache_dir, "herbrand_base"))
+
+
+def limit_graph(args, graph, query):
+    """
+    Keep only the part of the graph within the --depth and --max-nodes budget, if any.
+    """
+    if args.depth is None and args.max_nodes is None and not args.expand:
+        return graph
+    from .explanation import LazyExplanation
+
+    with stage("limit graph"):
+        explanation = LazyExplanation(graph, query)
+        for atom in args.expand:
+            try:
+                explanation.expand(atom)
+            except KeyError:
+                log.warning(
+                    "%s is not in the graph of %s and is not expanded",
+                    atom,
+                    " ".join(str(element) for element in query),
+                )
+        return explanation.to_model(args.depth, args.max_nodes)
+
+
+def explanation_cache(args):
+    """
+    Return the explanation cache selected on the command line, if any.
+    """
+    if args.no_cache or args.no_explanation_cache:
+        return None
+    return ExplanationCache(os.path.join(args.cache_dir, "explanation"))
+
+
+def ground_program_cache(args):
+    """
+    Return the cache of ground programs with selectors, if any.
+    """
+    if args.no_cache:
+        return None
+    return GroundProgramCache(os.path.join(args.cache_dir, "ground_program"))
+
+
+def warn_if_incomplete(graph, query) -> None:
+    """
+    Warn if the computation of the graph was interrupted by --timeout.
+    """
+    reason = incomplete(graph)
+    if reason is not None:
+        log.warning(
+            "The explanation of %s is incomplete (%s): the timeout was reached",
+            " ".join(str(atom) for atom in query),
+            reason,
+        )
+
+
+def slice_of(args, program, herbrand_base, query, explicitly_mentioned_atoms):
+    """
+    Return the rules and the Herbrand base connected to the query, for --slice.
+    """
+    from .slicing import slice_program
+
+    with stage("slice"):
+        sliced = slice_program(
+            program,
+            herbrand_base,
+            query,
+            explicitly_mentioned_atoms,
+            args.clingo_args,
+        )
+    log.info(
+        "Slice: %d of %d rules, %d of %d atoms",
+        len(sliced.program),
+        sliced.total_rules,
+        len(sliced.herbrand_base),
+        sliced.total_atoms,
+    )
+    return sliced.program, sliced.herbrand_base
+
+
+def check_slice(graph, reference) -> None:
+    """
+    Report whether the graph of the sliced program is the one of the whole program, for --check-slice.
+    """
+    from .slicing import same_graph
+
+    if same_graph(graph, reference):
+        log.info("Slice check: the graph is the same as without slicing")
+    else:
+        log.error("Slice check: the graph differs from the one without slicing")
+
+
+def explain_queries(
+    args, program, answer_set, explicitly_mentioned_atoms, herbrand_base=None
+):
+    """
+    Explain every query of the --queries file, saving one graph per query.
+
+    The Herbrand base is computed unless given, as with --solve.
+    """
+    from .parallel import explain_parallel
+
+    quiet = not args.verbose
+    queries = read_queries(args.queries)
+    if args.jobs > 1 and args.solver_stats:
+        log.warning("Solver statistics are not collected from the worker processes")
+    os.makedirs(args.output_dir, exist_ok=True)
+    batch = (
+        explain_parallel(
+            program,
+            answer_set,
+            queries,
+            explicitly_mentioned_atoms,
+            args.move_before,
+            herbrand_base_cache(args),
+            jobs=args.jobs,
+            explanation_cache=explanation_cache(args),
+            timeout=args.timeout,
+            ground_program_cache=ground_program_cache(args),
+            arguments=args.clingo_args,
+            herbrand_base=herbrand_base,
+        )
+        if args.jobs > 1
+        else explain_batch(
+            program,
+            answer_set,
+            queries,
+            explicitly_mentioned_atoms,
+            args.move_before,
+            herbrand_base_cache(args),
+            explanation_cache(args),
+            args.timeout,
+            ground_program_cache(args),
+            args.clingo_args,
+            herbrand_base,
+        )
+    )
+    for index, (query, graph) in enumerate(batch, start=1):
+        warn_if_incomplete(graph, query)
+        graph = limit_graph(args, graph, query)
+        file_name = os.path.join(args.output_dir, f"graph_{index}.{args.graph_format}")
+        if args.graph_format == "ucxg":
+            save_graph_binary(graph, file_name)
+        else:
+            save_graph(graph, file_name)
+        print_with_title("Query", query, quiet)
+        print_with_title("Graph", graph, quiet)
+        print(f"{' '.join(str(atom) for atom in query)}: {file_name}")
+
+
+def explain_merged(args, program, answer_set, explicitly_mentioned_atoms):
+    """
+    Explain the atoms of --explain-all into one merged graph, saved in the output directory.
+    """
+    from .merged import explain_all, select_atoms
+
+    quiet = not args.verbose
+    if "." in args.explain_all:
+        atoms = parse_model(args.explain_all, "atoms to explain")
+    else:
+        atoms = select_atoms(answer_set, args.explain_all.split())
+    if not atoms:
+        log.warning("No atom to explain for %s", args.explain_all)
+    merged = explain_all(
+        program,
+        answer_set,
+        atoms,
+        explicitly_mentioned_atoms,
+        args.move_before,
+        herbrand_base_cache(args),
+        explanation_cache(args),
+        args.timeout,
+        ground_program_cache(args),
+        args.clingo_args,
+    )
+    log.info(
+        "Explained %d of %d atoms, the others are justified in their graphs: %d nodes",
+        len(merged.explained),
+        len(atoms),
+        len(merged),
+    )
+    graph = merged.to_model()
+    warn_if_incomplete(graph, atoms)
+    graph = limit_graph(args, graph, atoms)
+    os.makedirs(args.output_dir, exist_ok=True)
+    file_name = os.path.join(args.output_dir, f"graph.{args.graph_format}")
+    if args.graph_format == "ucxg":
+        save_graph_binary(graph, file_name)
+    else:
+        save_graph(graph, file_name)
+    print_with_title("Atoms", atoms, quiet)
+    print_with_title("Graph", graph, quiet)
+    print(f"{len(atoms)} atoms: {file_name}")
+    if args.view:
+        visualize(graph, arguments=args.clingo_args)
+    if args.view_tree:
+        visualize(graph, tree=True, arguments=args.clingo_args)
+
+
+def explain_core(args, program, answer_set, query, explicitly_mentioned_atoms):
+    """
+    Print a minimal set of rules entailing the query, given the rest of the answer set.
+    """
+    from .unsat_core import minimal_core
+
+    answer_set_atoms = set(answer_set)
+    query_atoms = set(query)
+    with stage("unsat core"):
+        core = minimal_core(
+            str(program),
+            [
+                str(atom) if atom in answer_set_atoms else f"not {atom}"
+                for atom in query
+            ],
+            strategy=args.core,
+            arguments=args.clingo_args,
+            true_atoms=[str(atom) for atom in answer_set if atom not in query_atoms],
+            false_atoms=[
+                str(atom)
+                for atom in explicitly_mentioned_atoms
+                if atom not in query_atoms
+            ],
+        )
+    print_with_title("Minimal core", list(core.rules))
+    print(f"Solver calls ({core.strategy}): {core.solver_calls}")
+
+
+def serve(args, program):
+    """
+    Answer explanation requests against the loaded program until the input is closed.
+    """
+    from .server import ExplanationServer
+
+    server = ExplanationServer(
+        program,
+        answer=args.answer,
+        false=args.false,
+        move_before=args.move_before,
+        workers=args.workers,
+        cache=herbrand_base_cache(args),
+        explanation_cache=explanation_cache(args),
+        timeout=args.timeout,
+        ground_program_cache=ground_program_cache(args),
+        arguments=args.clingo_args,
+    )
+    try:
+        if args.socket:
+            server.serve_unix_socket(args.socket)
+        else:
+            server.serve_stdio()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
 
 
 def main():
@@ -27,74 +315,204 @@ def main():
     """
     parser = get_parser()
     args = parser.parse_args()
+    log.setLevel(args.log)
     args.move_before = [] if not args.move_before else args.move_before
+    args.clingo_args = split_arguments(args.clingo_args)
+    files = [args.answer_file, args.false_file, args.query_file]
+    if files.count("-") > 1 or ("-" in files and args.queries is sys.stdin):
+        parser.error("only one input can be read from stdin")
+    for option in ("socket", "workers"):
+        if getattr(args, option) is not None and not args.server:
+            parser.error(f"--{option} can only be used with --server")
+    if args.workers is None:
+        args.workers = 1
+    if args.socket is not None:
+        from .server import is_stale_socket
+
+        try:
+            is_stale_socket(args.socket)
+        except FileExistsError as e:
+            parser.error(f"--socket: {e}")
+    profiling = args.profile or args.profile_json or args.profile_memory
+    if not (profiling or args.solver_stats):
+        run(args)
+        return
+
+    profiler = Profiler(trace_memory=args.profile_memory) if profiling else None
+    statistics = None
+    if args.solver_stats:
+        statistics = SolverStatistics(
+            setup_logger("statistics", logging.DEBUG if args.verbose else args.log)
+        )
+    try:
+        with profiler or contextlib.nullcontext(), statistics or contextlib.nullcontext():
+            run(args)
+    finally:
+        if profiler is not None:
+            setup_logger("profile", logging.INFO).info("Profile:\n%s", profiler.table())
+            if args.profile_json:
+                profiler.write_json(args.profile_json)
+        if statistics is not None:
+            statistics.write(args.solver_stats)
+            log.info(
+                "Statistics of %d solver calls written to %s",
+                len(statistics.calls),
+                args.solver_stats,
+            )
+
+
+def run(args):
+    """
+    Explain the query (or the queries) given on the command line.
+    """
     quiet = not args.verbose
     # Program
-    program = program_from_files([f.name for f in args.prg])
+    with stage("parse program"):
+        program = program_from_files([f.name for f in args.prg])
     print_with_title("INPUT PROGRAM", program, quiet)
 
-    try:
-        answer_set = Model.of_program(args.answer)
-        print_with_title("Answer set", answer_set, quiet)
-    except Exception as e:
-        print_error("The answer set should be presented a facts with '.'")
-        raise e
+    if args.server:
+        if args.solve:
+            with stage("solve"):
+                args.answer = solve(program, args.solve, arguments=args.clingo_args)[
+                    0
+                ].as_facts
+        elif args.answer_file is not None:
+            with stage("parse answer set"):
+                args.answer = read_model(
+                    args.answer_file, args.input_format, args.witness
+                ).as_facts
+        serve(args, program)
+        return
 
-    try:
-        query = Model.of_program(args.query)
-        print_with_title("Query", query, quiet)
-    except Exception as e:
-        print_error("The query set should be presented a facts with '.'")
-        raise e
+    with stage("parse false atoms"):
+        explicitly_mentioned_atoms = model_of(
+            args, args.false, args.false_file, "false atoms set"
+        )
 
-    try:
-        explicitly_mentioned_atoms = Model.of_program(args.false)
-        print_with_title("Explicit false", explicitly_mentioned_atoms, quiet)
-    except Exception as e:
-        print_error("The false atoms set should be presented a facts with '.'")
-        raise e
+    query = Model.of_atoms()
+    if args.query or args.query_file:
+        with stage("parse query"):
+            query = model_of(args, args.query, args.query_file, "query set")
 
-    herbrand_base = SymbolicProgram.of(
-        *program,
-        *SymbolicProgram.parse(answer_set.as_facts),
-        *SymbolicProgram.parse(query.as_facts),
-        *SymbolicProgram.parse(explicitly_mentioned_atoms.as_facts),
-    ).herbrand_base
+    # with --solve, the Herbrand base comes from the same grounding as the answer set
+    solved_herbrand_base = None
+    if args.solve:
+        with stage("solve"):
+            answer_set, solved_herbrand_base = solve(
+                program,
+                args.solve,
+                query,
+                explicitly_mentioned_atoms,
+                arguments=args.clingo_args,
+            )
+    else:
+        with stage("parse answer set"):
+            answer_set = model_of(args, args.answer, args.answer_file, "answer set")
+    print_with_title("Answer set", answer_set, quiet)
+    print_with_title("Explicit false", explicitly_mentioned_atoms, quiet)
 
-    # Move atoms
-    herbrand_base = SymbolicProgram.parse(herbrand_base.as_facts)
+    if args.queries:
+        herbrand_base = None
+        if solved_herbrand_base is not None:
+            with stage("move_before"):
+                herbrand_base = move_before(solved_herbrand_base, args.move_before)
+        explain_queries(
+            args, program, answer_set, explicitly_mentioned_atoms, herbrand_base
+        )
+        return
 
-    for s in args.move_before:
-        herbrand_base = herbrand_base.move_before(SymbolicAtom.parse(s))
+    if args.explain_all:
+        explain_merged(args, program, answer_set, explicitly_mentioned_atoms)
+        return
 
-    print_with_title("Herbrand base", herbrand_base, quiet)
+    print_with_title("Query", query, quiet)
 
-    herbrand_base = tuple(
-        GroundAtom.parse(str(rule.head_atom)) for rule in herbrand_base
-    )
+    if args.core:
+        explain_core(args, program, answer_set, query, explicitly_mentioned_atoms)
+        return
 
-    # Moving stuff would go here
+    if solved_herbrand_base is not None:
+        with stage("move_before"):
+            herbrand_base = move_before(solved_herbrand_base, args.move_before)
+    else:
+        herbrand_base = herbrand_base_of(
+            program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            args.move_before,
+            herbrand_base_cache(args),
+            args.clingo_args,
+        )
+    print_with_title("Herbrand base", list(herbrand_base), quiet)
 
     # compute DAG
+    from dumbo_asp.queries import explanation_graph, pack_xasp_navigator_url
+
     pus_program = []
-    graph = explanation_graph(
-        program=program,
-        answer_set=answer_set,
-        herbrand_base=herbrand_base,
-        query=query,
-        collect_pus_program=pus_program,
+
+    def compute(program, herbrand_base, collect_pus_program=None):
+        cache = ground_program_cache(args)
+        if (
+            args.timeout is not None
+            or cache is not None
+            or args.clingo_args
+            or args.solver_stats
+        ):
+            # unlike explanation_graph, the Explainer can interrupt its solver calls, reuse a cached
+            # ground program, pass arguments to clingo and record the statistics of its solver calls
+            explainer = explainer_of(program, herbrand_base, cache, args.clingo_args)
+            with stage("explanation graph"):
+                return explainer.explain(
+                    answer_set,
+                    query,
+                    collect_pus_program=collect_pus_program,
+                    timeout=args.timeout,
+                )
+        with stage("explanation graph"):
+            return explanation_graph(
+                program=program,
+                answer_set=answer_set,
+                herbrand_base=herbrand_base,
+                query=query,
+                collect_pus_program=collect_pus_program,
+            )
+
+    explained_program, explained_herbrand_base = program, herbrand_base
+    if args.slice or args.check_slice:
+        explained_program, explained_herbrand_base = slice_of(
+            args, program, herbrand_base, query, explicitly_mentioned_atoms
+        )
+    graph = cached_explanation(
+        explanation_cache(args),
+        explained_program,
+        answer_set,
+        query,
+        explicitly_mentioned_atoms,
+        explained_herbrand_base,
+        functools.partial(
+            compute,
+            explained_program,
+            explained_herbrand_base,
+            pus_program if args.verbose else None,
+        ),
+        args.clingo_args,
     )
     print_with_title("Grounded Program with selectors", pus_program, quiet)
+    if args.check_slice:
+        # the PUS program of the whole program is not shown
+        check_slice(graph, compute(program, herbrand_base))
+    warn_if_incomplete(graph, query)
+    graph = limit_graph(args, graph, query)
 
     print_with_title("Graph", graph, quiet)
 
     if args.view:
-        save_graph(graph)
-        visualize("./graph.lp")
+        visualize(graph, arguments=args.clingo_args)
 
     if args.view_tree:
-        save_graph(graph)
-        visualize("./graph.lp", tree=True)
+        visualize(graph, tree=True, arguments=args.clingo_args)
 
     if args.navigate:
         # show DAG
@@ -0,0 +1,271 @@
+"""
+Content-addressed on-disk caches reused across runs.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from importlib.metadata import PackageNotFoundError, version
+from typing import Dict, Iterable, Optional, Sequence
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+__all__ = [
+    "ExplanationCache",
+    "GroundProgramCache",
+    "HerbrandBaseCache",
+    "default_cache_dir",
+]
+
+# to be increased whenever the entries change for the same inputs (e.g., the graph format or the explainer)
+FORMAT_VERSION = 1
+
+
+def default_cache_dir() -> str:
+    """
+    Return the directory used when no cache directory is given.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "ucorexplain")
+
+
+@functools.lru_cache(maxsize=1)
+def _versions() -> tuple[str, ...]:
+    res = [str(FORMAT_VERSION), clingo.__version__]
+    for package in ("ucorexplain", "dumbo-asp"):
+        try:
+            res.append(version(package))
+        except PackageNotFoundError:  # nocoverage
+            res.append("local")
+    return tuple(res)
+
+
+def _arguments(arguments: Sequence[str]) -> str:
+    # clingo arguments can change grounding (e.g., -c constants), and later ones override earlier ones
+    return json.dumps(list(arguments))
+
+
+def digest(*parts: str) -> str:
+    """
+    Hash the given parts into a hexadecimal key; parts are length-prefixed so that they cannot run together.
+
+    The key also depends on FORMAT_VERSION and on the versions of clingo, ucorexplain and dumbo-asp,
+    so that entries computed by other versions are never served.
+    """
+    sha = hashlib.sha256()
+    for part in (*_versions(), *parts):
+        data = part.encode()
+        sha.update(len(data).to_bytes(8, "little"))
+        sha.update(data)
+    return sha.hexdigest()
+
+
+class DiskCache:
+    """
+    A directory of compressed entries named by their key, evicting the least recently used ones
+    beyond max_entries or, if given, max_bytes of compressed data.
+
+    Entries are written to a temporary file and renamed, so concurrent readers never see partial entries.
+    """
+
+    MAGIC = b"UCX0"
+    SUFFIX = ".bin"
+
+    def __init__(
+        self, directory: str, max_entries: int = 64, max_bytes: Optional[int] = None
+    ):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        if not data.startswith(self.MAGIC):
+            return None
+        try:
+            return zlib.decompress(data[len(self.MAGIC) :])
+        except zlib.error:
+            return None
+
+    def store(self, key: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.MAGIC)
+                f.write(zlib.compress(data))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort(reverse=True)
+        kept = entries[: self.max_entries]
+        if self.max_bytes is not None:
+            total = 0
+            for index, (_, size, _) in enumerate(kept):
+                total += size
+                # the most recent entry is always kept
+                if total > self.max_bytes and index > 0:
+                    kept = kept[:index]
+                    break
+        for _, _, path in entries[len(kept) :]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+class HerbrandBaseCache(DiskCache):
+    """
+    Cache of (reordered) Herbrand bases keyed by program, answer set, query, false atoms, clingo arguments and
+    --move-before patterns.
+    """
+
+    SUFFIX = ".hb"
+
+    @staticmethod
+    def key(
+        program,
+        answer_set,
+        query,
+        explicitly_mentioned_atoms,
+        move_before: Sequence[str] = (),
+        arguments: Sequence[str] = (),
+    ) -> str:
+        return digest(
+            "herbrand_base",
+            str(program),
+            answer_set.as_facts,
+            query.as_facts,
+            explicitly_mentioned_atoms.as_facts,
+            _arguments(arguments),
+            *move_before,
+        )
+
+    def get(self, key: str) -> Optional[tuple[GroundAtom, ...]]:
+        data = self.load(key)
+        if data is None:
+            return None
+        if not data:
+            return ()
+        return tuple(
+            GroundAtom(clingo.parse_term(atom)) for atom in data.decode().split("\n")
+        )
+
+    def put(self, key: str, herbrand_base: Iterable[GroundAtom]) -> None:
+        self.store(key, "\n".join(str(atom) for atom in herbrand_base).encode())
+
+
+class ExplanationCache(DiskCache):
+    """
+    Cache of explanation graphs keyed by program, answer set, false atoms, query, order of the Herbrand base and
+    clingo arguments.
+
+    The graph is stored as its atoms, one per line, in the order computed.
+    """
+
+    SUFFIX = ".xg"
+
+    def __init__(
+        self, directory: str, max_entries: int = 256, max_bytes: Optional[int] = 2**28
+    ):
+        super().__init__(directory, max_entries, max_bytes)
+
+    @staticmethod
+    def key(
+        program,
+        answer_set,
+        query,
+        explicitly_mentioned_atoms,
+        herbrand_base: Iterable[GroundAtom],
+        arguments: Sequence[str] = (),
+    ) -> str:
+        return digest(
+            "explanation",
+            str(program),
+            answer_set.as_facts,
+            query.as_facts,
+            explicitly_mentioned_atoms.as_facts,
+            "\n".join(str(atom) for atom in herbrand_base),
+            _arguments(arguments),
+        )
+
+    def get(self, key: str) -> Optional[Model]:
+        data = self.load(key)
+        if data is None:
+            return None
+        return Model.of_elements(
+            (
+                GroundAtom(clingo.parse_term(atom))
+                for atom in data.decode().split("\n")
+                if atom
+            ),
+            sort=False,
+        )
+
+    def put(self, key: str, graph: Iterable[GroundAtom]) -> None:
+        self.store(key, "\n".join(str(atom) for atom in graph).encode())
+
+
+class GroundProgramCache(DiskCache):
+    """
+    Cache of the ground programs with selectors of Explainer (Explainer.ground_program), keyed by program,
+    Herbrand base and clingo arguments, so that changing any of them invalidates the entry.
+    """
+
+    SUFFIX = ".gp"
+
+    def __init__(
+        self, directory: str, max_entries: int = 16, max_bytes: Optional[int] = 2**29
+    ):
+        super().__init__(directory, max_entries, max_bytes)
+
+    @staticmethod
+    def key(
+        program, herbrand_base: Iterable[GroundAtom], arguments: Sequence[str] = ()
+    ) -> str:
+        return digest(
+            "ground_program",
+            str(program),
+            "\n".join(str(atom) for atom in herbrand_base),
+            _arguments(arguments),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        data = self.load(key)
+        if data is None:
+            return None
+        return json.loads(data)
+
+    def put(self, key: str, ground_program: Dict[str, str]) -> None:
+        self.store(key, json.dumps(ground_program).encode())
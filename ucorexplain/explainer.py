@@ -0,0 +1,561 @@
+"""
+Incremental computation of explanation graphs on top of a single multi-shot clingo control.
+
+The program extended with the ``__pus__`` selector atoms is expanded and grounded once.
+The truth value of every atom of the Herbrand base is an external atom, so that a new answer set only
+reassigns the externals that changed, and every query adds just the rule deriving it.
+
+The expanded program, its serialization and the ground program (in the aspif format) are available as
+Explainer.ground_program, and an Explainer of the same program and Herbrand base can be built from them
+without expanding and grounding again.
+"""
+
+import functools
+import os
+import re
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+from dumbo_asp.primitives.rules import SymbolicRule
+from dumbo_asp.queries import META_DERIVATION_SEQUENCE, META_EXPLANATION_GRAPH
+
+from .explanation import INCOMPLETE
+from .utils.control import control_arguments
+from .utils.statistics import explaining, solver_call
+
+__all__ = ["Explainer"]
+
+PUS_CONTROL_ARGUMENTS = (
+    "--supp-models",
+    "--no-ufs-check",
+    "--sat-prepro=no",
+    "--eq=0",
+    "--no-backprop",
+)
+ASSUMPTION_PATTERN = re.compile(r"__pus__\(answer_set,\d+\)\.$")
+EXTERNAL_VALUES = {
+    clingo.TruthValue.Free: 0,
+    clingo.TruthValue.True_: 1,
+    clingo.TruthValue.False_: 2,
+    clingo.TruthValue.Release: 3,
+}
+
+
+def _selector(kind: str, index: int) -> clingo.Symbol:
+    return clingo.Function("__pus__", [clingo.Function(kind), clingo.Number(index)])
+
+
+def _string(value) -> str:
+    return str(clingo.String(str(value)))
+
+
+def _solve(
+    control: clingo.Control,
+    deadline: Optional[float],
+    step: str,
+    nodes: Callable[[], Iterable] = tuple,
+    **kwargs,
+) -> Optional[clingo.SolveResult]:
+    """
+    Solve, interrupting the search at the deadline (a time.monotonic() value); return None if interrupted.
+
+    The call is recorded as the given step of the explanation, justifying nodes(), if solver statistics are collected.
+    """
+
+    def run() -> Optional[clingo.SolveResult]:
+        if deadline is None:
+            return control.solve(**kwargs)
+        # on_core is not called by asynchronous solving, the core is read from the handle instead
+        on_core = kwargs.pop("on_core", None)
+        with control.solve(async_=True, **kwargs) as handle:
+            if not handle.wait(max(0.0, deadline - time.monotonic())):
+                handle.cancel()
+                return None
+            result = handle.get()
+            if on_core is not None and result.unsatisfiable:
+                on_core(handle.core())
+            return result
+
+    return solver_call(control, step, run, nodes)
+
+
+def _nodes(sequence: List[GroundAtom], start: int) -> List[str]:
+    # the atoms assigned by a step of the derivation sequence, i.e., the nodes of the graph it justifies
+    return [
+        atom.arguments[0].string
+        for atom in sequence[start:]
+        if atom.predicate_name == "assign"
+    ]
+
+
+def _incomplete(reason: str) -> GroundAtom:
+    return GroundAtom(clingo.Function(INCOMPLETE, [clingo.Function(reason)]))
+
+
+class _AspifWriter(clingo.Observer):
+    """
+    Record the ground program in the aspif format, until close() is called.
+    """
+
+    def __init__(self):
+        self.lines: Optional[List[str]] = ["asp 1 0 0"]
+
+    def _add(self, *values) -> None:
+        if self.lines is not None:
+            self.lines.append(" ".join(map(str, values)))
+
+    def rule(self, choice: bool, head: Sequence[int], body: Sequence[int]) -> None:
+        self._add(1, int(choice), len(head), *head, 0, len(body), *body)
+
+    def weight_rule(
+        self,
+        choice: bool,
+        head: Sequence[int],
+        lower_bound: int,
+        body: Sequence[Tuple[int, int]],
+    ) -> None:
+        weights = [value for element in body for value in element]
+        self._add(1, int(choice), len(head), *head, 1, lower_bound, len(body), *weights)
+
+    def external(self, atom: int, value: clingo.TruthValue) -> None:
+        self._add(5, atom, EXTERNAL_VALUES[value])
+
+    def output_atom(self, symbol: clingo.Symbol, atom: int) -> None:
+        name = str(symbol)
+        self._add(4, len(name.encode()), name, *((1, atom) if atom else (0,)))
+
+    def close(self) -> str:
+        lines, self.lines = self.lines, None
+        assert lines is not None, "the writer is already closed"
+        return "\n".join(lines + ["0", ""])
+
+
+class _QueryStopper(clingo.Propagator):
+    """
+    Forbid the current query to hold, so that a set of selectors is a PUS iff solving under it is unsatisfiable.
+    """
+
+    def __init__(self):
+        self.symbol: Optional[clingo.Symbol] = None
+        self.literal: Optional[int] = None
+
+    def init(self, init):
+        self.literal = None
+        atom = init.symbolic_atoms[self.symbol]
+        if atom is not None:
+            self.literal = init.solver_literal(atom.literal)
+            init.add_watch(self.literal)
+
+    def propagate(self, control, changes):
+        if self.literal in changes:
+            control.add_clause(clause=[-self.literal], tag=True)
+
+
+class Explainer:
+    """
+    Explain queries against a fixed program and Herbrand base, changing only answer set and query between calls.
+    """
+
+    def __init__(
+        self,
+        program: SymbolicProgram,
+        herbrand_base: Iterable[GroundAtom],
+        ground_program: Optional[Dict[str, str]] = None,
+        arguments: Sequence[str] = (),
+    ):
+        """
+        Expand and ground the program with selectors, unless ground_program (the ground_program of an
+        Explainer of the same program and Herbrand base) is given.
+
+        The clingo arguments (e.g., ``--parallel-mode=4``) are passed to every control, replacing the
+        defaults for the same options.
+        """
+        self.program = program
+        self.herbrand_base = tuple(herbrand_base)
+        self.arguments = tuple(arguments)
+        self._control = clingo.Control(
+            control_arguments(PUS_CONTROL_ARGUMENTS, self.arguments)
+        )
+
+        if ground_program is None:
+            expanded_program = SymbolicProgram.of(
+                rule.with_extended_body(SymbolicAtom.parse(f"__pus__(program,{index})"))
+                for index, rule in enumerate(program)
+            )
+            self._expanded = expanded_program.with_named_anonymous_variables.expand_global_and_local_variables(
+                herbrand_base=Model.of_atoms(
+                    *self.herbrand_base,
+                    *(_selector("program", index) for index in range(len(program))),
+                    sort=False,
+                )
+            )
+            self._expanded_text = str(self._expanded)
+            self._serialized_program = [
+                f"{atom}."
+                for atom in self._expanded.serialize_as_strings(base64_encode=False)
+            ]
+            writer = _AspifWriter()
+            self._control.register_observer(writer)
+            self._control.add("base", [], self._base_program())
+            self._control.ground([("base", [])])
+            self.ground_program = {
+                "expanded": self._expanded_text,
+                "serialized": "\n".join(self._serialized_program),
+                "aspif": writer.close(),
+            }
+        else:
+            self._expanded = None
+            self._expanded_text = ground_program["expanded"]
+            self._serialized_program = ground_program["serialized"].split("\n")
+            self.ground_program = ground_program
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "program.aspif")
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(ground_program["aspif"])
+                self._control.load(path)
+            self._control.ground([("base", [])])
+
+        self._truth: List[Optional[bool]] = [None] * len(self.herbrand_base)
+        self._queries = 0
+        self._stopper = _QueryStopper()
+        self._control.register_propagator(self._stopper)
+
+        self._selector_literal = {}
+        for atom in self._control.symbolic_atoms.by_signature("__pus__", 2):
+            self._selector_literal[atom.symbol] = atom.literal
+
+    @property
+    def _expanded_program(self) -> SymbolicProgram:
+        # parsed again only if the PUS program is collected from an Explainer built from a ground program
+        if self._expanded is None:
+            self._expanded = SymbolicProgram.parse(self._expanded_text)
+        return self._expanded
+
+    def _base_program(self) -> str:
+        lines = [self._expanded_text]
+        for index, atom in enumerate(self.herbrand_base):
+            lines.append(f"#external {atom}.")
+            lines.append(f"#external __pus_true__({index}).")
+            lines.append(
+                f":- not {atom}; __pus__(answer_set,{index}); __pus_true__({index})."
+            )
+            lines.append(
+                f":- {atom}; __pus__(answer_set,{index}); not __pus_true__({index})."
+            )
+        lines.append(
+            "{"
+            + "; ".join(
+                [f"__pus__(program,{index})" for index in range(len(self.program))]
+                + [
+                    f"__pus__(answer_set,{index})"
+                    for index in range(len(self.herbrand_base))
+                ]
+            )
+            + "}."
+        )
+        return "\n".join(lines)
+
+    def _assign_answer_set(self, answer_set_atoms) -> None:
+        for index, atom in enumerate(self.herbrand_base):
+            value = atom in answer_set_atoms
+            if self._truth[index] is not value:
+                self._control.assign_external(
+                    clingo.Function("__pus_true__", [clingo.Number(index)]), value
+                )
+                self._truth[index] = value
+
+    def _add_query(self, query_literals: Sequence[str]) -> clingo.Symbol:
+        self._queries += 1
+        symbol = clingo.Function("__pus_query__", [clingo.Number(self._queries)])
+        name = f"query_{self._queries}"
+        body = ", ".join(query_literals)
+        self._control.add(name, [], f"{symbol} :- {body}." if body else f"{symbol}.")
+        self._control.ground([(name, [])])
+        return symbol
+
+    def _trim(self, selectors: List[clingo.Symbol], deadline: Optional[float]) -> bool:
+        """
+        Drop the trailing selectors outside the unsat core; return False if interrupted, leaving selectors as they are.
+        """
+        core: List[int] = []
+        result = _solve(
+            self._control,
+            deadline,
+            "pus",
+            assumptions=[self._selector_literal[selector] for selector in selectors],
+            on_core=core.extend,
+        )
+        if result is None:
+            return False
+        if result.unsatisfiable:
+            while selectors and self._selector_literal[selectors[-1]] not in core:
+                selectors.pop()
+        else:
+            selectors.clear()
+        return True
+
+    def _preferred_pus(
+        self, assumed: Sequence[int], deadline: Optional[float] = None
+    ) -> Tuple[List[clingo.Symbol], Optional[str]]:
+        """
+        Return the selectors of the preferred PUS, and the reason why it is incomplete if the deadline is reached:
+        ``unsat`` if unsatisfiability was not established, ``pus`` if the set is not minimal yet.
+        """
+        selectors = [_selector("program", index) for index in range(len(self.program))]
+        selectors.extend(_selector("answer_set", index) for index in assumed)
+        if not self._trim(selectors, deadline):
+            return [], "unsat"
+        required_selectors = 0
+        while required_selectors < len(selectors):
+            required_selectors += 1
+            # last selector is required... move it ahead
+            selectors.insert(0, selectors.pop())
+            if not self._trim(selectors, deadline):
+                return selectors, "pus"
+        return selectors, None
+
+    def explain(
+        self,
+        answer_set: Model,
+        query: Model,
+        *,
+        collect_pus_program: Optional[List[SymbolicProgram]] = None,
+        timeout: Optional[float] = None,
+    ) -> Model:
+        """
+        Compute the explanation graph of the query, as dumbo_asp.queries.explanation_graph does.
+
+        After timeout seconds the solver is interrupted and the graph built so far is returned, with an atom
+        incomplete(reason): ``unsat`` (nothing could be explained), ``pus`` (the explanation uses more rules
+        and assumptions than needed) or ``derivation`` (only part of the derivation was explained).
+        An incomplete graph shows the atoms derived so far, except facts, from at least two steps of the
+        derivation. Grounding, the first two steps of the derivation and the links of the graph are not
+        interrupted, so that the call may take longer than timeout.
+        """
+        with explaining(query):
+            return self._explain(answer_set, query, collect_pus_program, timeout)
+
+    def _explain(
+        self,
+        answer_set: Model,
+        query: Model,
+        collect_pus_program: Optional[List[SymbolicProgram]],
+        timeout: Optional[float],
+    ) -> Model:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        answer_set_atoms = set(answer_set)
+        query_atoms = set(query)
+        query_literals = []
+        assumed = []
+        for index, atom in enumerate(self.herbrand_base):
+            if atom in query_atoms:
+                query_literals.append(
+                    str(atom) if atom in answer_set_atoms else f"not {atom}"
+                )
+                query_atoms.remove(atom)
+            else:
+                assumed.append(index)
+        for atom in query_atoms:
+            query_literals.append(f"not {atom}")
+
+        self._assign_answer_set(answer_set_atoms)
+        self._stopper.symbol = self._add_query(query_literals)
+        selectors, incomplete = self._preferred_pus(assumed, deadline)
+        if incomplete == "unsat":
+            return Model.of_elements([_incomplete(incomplete)], sort=False)
+
+        # rename the selectors of the answer set as if only assumed atoms were numbered
+        position = {index: position for position, index in enumerate(assumed)}
+        constraints = [
+            (
+                f":- not {self.herbrand_base[index]} %* assumption *%; __pus__(answer_set,{position[index]})."
+                if self._truth[index]
+                else f":-     {self.herbrand_base[index]} %* assumption *%; __pus__(answer_set,{position[index]})."
+            )
+            for index in assumed
+        ]
+        selectors = [
+            (
+                selector
+                if selector.arguments[0].name == "program"
+                else _selector("answer_set", position[selector.arguments[1].number])
+            )
+            for selector in selectors
+        ]
+        query_rule = f"__pus__ :- {', '.join(query_literals)}."
+        choice_rule = (
+            "{"
+            + "; ".join(
+                [f"__pus__(program,{index})" for index in range(len(self.program))]
+                + [f"__pus__(answer_set,{index})" for index in range(len(assumed))]
+            )
+            + "}."
+        )
+        if collect_pus_program is not None:
+            self._collect(
+                collect_pus_program,
+                constraints,
+                query_rule,
+                choice_rule,
+                selectors,
+                len(assumed),
+            )
+
+        serialization = "\n".join(
+            self._serialized_program
+            + [
+                f"{atom}."
+                for rule in [*constraints, query_rule, choice_rule]
+                for atom in SymbolicRule.parse(rule).serialize_as_strings(
+                    base64_encode=False
+                )
+            ]
+            + [
+                f"{atom}."
+                for selector in selectors
+                for atom in SymbolicRule.parse(f"{selector}.").serialize_as_strings(
+                    base64_encode=False
+                )
+            ]
+            + [f"query({_string(atom)})." for atom in query]
+        )
+        graph, complete = self._graph(serialization, deadline)
+        if complete and incomplete is None:
+            return graph
+        return Model.of_elements(
+            [*graph, _incomplete(incomplete or "derivation")], sort=False
+        )
+
+    def _collect(
+        self, collect_pus_program, constraints, query_rule, choice_rule, selectors, size
+    ):
+        all_selectors = [
+            *(_selector("program", index) for index in range(len(self.program))),
+            *(_selector("answer_set", index) for index in range(size)),
+        ]
+        collect_pus_program.append(
+            SymbolicProgram.parse("\n".join(f"{atom}." for atom in all_selectors))
+        )
+        collect_pus_program.append(
+            SymbolicProgram.of(
+                *(
+                    rule.with_extended_body(
+                        SymbolicAtom.parse(f"__pus__(program,{index})")
+                    )
+                    for index, rule in enumerate(self.program)
+                ),
+                *(SymbolicRule.parse(rule) for rule in constraints),
+                SymbolicRule.parse(query_rule),
+                SymbolicRule.parse(
+                    "{"
+                    + f"__pus__(program,0..{len(self.program) - 1})"
+                    + (f"; __pus__(answer_set,0..{size - 1})" if size > 0 else "")
+                    + "}."
+                ),
+            )
+        )
+        selectors_program = SymbolicProgram.parse(
+            "\n".join(f"{atom}." for atom in selectors)
+        )
+        collect_pus_program.append(selectors_program)
+        collect_pus_program.append(
+            SymbolicProgram.of(
+                *self._expanded_program,
+                *(SymbolicRule.parse(rule) for rule in constraints),
+                SymbolicRule.parse(query_rule),
+                SymbolicRule.parse(choice_rule),
+                *selectors_program,
+            )
+        )
+
+    def _graph(
+        self, serialization: str, deadline: Optional[float] = None
+    ) -> Tuple[Model, bool]:
+        seen = set()
+        sequence = []
+        terminate = []
+        previous_len = 0
+
+        def collect(model):
+            for at in model.symbols(shown=True):
+                atom = GroundAtom(at)
+                if atom.predicate_name in ["assign", "constraint"]:
+                    key = (atom.predicate_name, atom.arguments[0])
+                elif atom.predicate_name == "cannot_support":
+                    key = (atom.predicate_name, atom.arguments[0], atom.arguments[1])
+                elif atom.predicate_name == "done":
+                    terminate.append(True)
+                    continue
+                else:
+                    assert False
+                if key not in seen:
+                    seen.add(key)
+                    sequence.append(atom)
+
+        sequence_control = clingo.Control(
+            control_arguments(["1", "--solve-limit=1"], self.arguments)
+        )
+        sequence_control.add(META_DERIVATION_SEQUENCE)
+        sequence_control.add(serialization)
+
+        complete = True
+        steps = 0
+        while not terminate:
+            for atom in sequence[previous_len:]:
+                sequence_control.add(f"{atom}.")
+            previous_len = len(sequence)
+            sequence_control.ground([("base", []), ("derivation_sequence", [])])
+            derived = functools.partial(_nodes, sequence, previous_len)
+            # the first step only assigns facts, which are not shown: the first two steps are never
+            # interrupted, so that there is something to show after an incomplete PUS
+            step_deadline = deadline if steps >= 2 else None
+            steps += 1
+            if (
+                _solve(
+                    sequence_control,
+                    step_deadline,
+                    "derivation",
+                    derived,
+                    on_model=collect,
+                )
+                is None
+            ):
+                complete = False
+                break
+            assert len(sequence) > previous_len
+
+        res = []
+
+        def rewrite_links(model):
+            for at in model.symbols(shown=True):
+                atom = GroundAtom(at)
+                if atom.predicate_name == "node":
+                    reason = atom.arguments[2]
+                    if len(reason.arguments) > 1 and re.search(
+                        ASSUMPTION_PATTERN, reason.arguments[1].string
+                    ):
+                        atom = GroundAtom.parse(
+                            f"node({atom.arguments[0]},{atom.arguments[1]},(assumption,))"
+                        )
+                res.append(atom)
+
+        links_control = clingo.Control(
+            control_arguments(["1", "--solve-limit=1"], self.arguments)
+        )
+        links_control.add(META_EXPLANATION_GRAPH)
+        links_control.add(serialization)
+        for atom in sequence:
+            links_control.add(f"{atom}.")
+        if not complete:
+            # the query is not derived yet: show what is, starting from every atom of the partial sequence
+            # that the graph would show
+            links_control.add("query(Atom) :- assign(Atom, _, _), not hide(Atom).")
+        links_control.ground([("base", [])])
+        # the links only follow from the sequence, and are computed even after the deadline
+        _solve(links_control, None, "links", on_model=rewrite_links)
+        return Model.of_elements(res, sort=False), complete
@@ -0,0 +1,168 @@
+"""
+On-demand access to explanation graphs.
+
+A LazyExplanation indexes the nodes and links of a graph and hands them out starting from the query:
+the children of a node are looked up only when they are requested, and to_model() materializes just the part
+of the graph within a depth or node budget (plus the nodes expanded explicitly), so that saving, rendering and
+navigating cost time proportional to what is shown rather than to the whole graph.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+__all__ = ["INCOMPLETE", "LazyExplanation", "incomplete"]
+
+TRUNCATED = "truncated"
+INCOMPLETE = "incomplete"
+
+
+def incomplete(graph: Iterable[GroundAtom]) -> Optional[str]:
+    """
+    Return why the computation of the graph was interrupted (see Explainer.explain), or None if it is complete.
+    """
+    for atom in graph:
+        if atom.predicate_name == INCOMPLETE:
+            return str(atom.arguments[0])
+    return None
+
+
+def _term(term) -> clingo.Symbol:
+    return clingo.String(term) if isinstance(term, str) else term
+
+
+def _is_none(symbol: clingo.Symbol) -> bool:
+    return str(symbol).strip('"') == "None"
+
+
+class LazyExplanation:
+    """
+    Explanation graph expanded from the query on demand.
+
+    The graph is a model of node/3 and link/3 atoms, as computed by Explainer.explain or
+    dumbo_asp.queries.explanation_graph; it is indexed in a single pass, without copying its atoms.
+    """
+
+    def __init__(self, graph: Iterable[GroundAtom], query: Optional[Model] = None):
+        self._nodes: Dict[clingo.Symbol, GroundAtom] = {}
+        self._links: Dict[clingo.Symbol, List[GroundAtom]] = {}
+        self._markers: List[GroundAtom] = []
+        has_parent = set()
+        for atom in graph:
+            if atom.predicate_name == "node" and not _is_none(atom.arguments[0]):
+                self._nodes[atom.arguments[0]] = atom
+            elif atom.predicate_name == "link" and not _is_none(atom.arguments[1]):
+                source, target = atom.arguments[0], atom.arguments[1]
+                self._links.setdefault(source, []).append(atom)
+                if source != target:
+                    has_parent.add(target)
+            elif atom.predicate_name == INCOMPLETE:
+                self._markers.append(atom)
+        if query is not None:
+            self.roots: Tuple[clingo.Symbol, ...] = tuple(
+                clingo.String(str(atom))
+                for atom in query
+                if clingo.String(str(atom)) in self._nodes
+            )
+        else:
+            self.roots = tuple(node for node in self._nodes if node not in has_parent)
+        self._expanded: set = set()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def node(self, term) -> GroundAtom:
+        """
+        Return the node/3 atom of the given atom of the graph (a string, as in the graph).
+        """
+        return self._nodes[_term(term)]
+
+    def links(self, term) -> Sequence[GroundAtom]:
+        """
+        Return the link/3 atoms from the given atom to its reasons.
+        """
+        return self._links.get(_term(term), ())
+
+    def children(self, term) -> Tuple[clingo.Symbol, ...]:
+        """
+        Return the atoms explaining the given one, in the order of the graph.
+        """
+        term = _term(term)
+        return tuple(
+            dict.fromkeys(
+                link.arguments[1]
+                for link in self.links(term)
+                if link.arguments[1] != term and link.arguments[1] in self._nodes
+            )
+        )
+
+    def expand(self, *terms) -> None:
+        """
+        Include the children of the given atoms in to_model(), whatever the budget.
+        """
+        for term in map(_term, terms):
+            if term not in self._nodes:
+                raise KeyError(f"{term} is not a node of the graph")
+            self._expanded.add(term)
+
+    def to_model(
+        self,
+        depth: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        expand: Iterable = (),
+    ) -> Model:
+        """
+        Return the nodes reachable from the query within depth links (the query is at depth 0) and
+        the first max_nodes of them in breadth-first order, with the links among them.
+
+        The children of the nodes given to expand() (or to expand, for this call only) are always included.
+        Nodes with children left out get an atom truncated(atom, number of hidden children).
+        """
+        expanded = self._expanded.union(map(_term, expand))
+        included: Dict[clingo.Symbol, int] = {}
+        queue: deque = deque()
+        for root in self.roots:
+            if max_nodes is None or len(included) < max_nodes:
+                included.setdefault(root, 0)
+        queue.extend(included)
+        while queue:
+            term = queue.popleft()
+            level = included[term]
+            is_expanded = term in expanded
+            if depth is not None and level >= depth and not is_expanded:
+                continue
+            for child in self.children(term):
+                if child in included:
+                    continue
+                if (
+                    max_nodes is not None
+                    and len(included) >= max_nodes
+                    and not is_expanded
+                ):
+                    break
+                included[child] = level + 1
+                queue.append(child)
+
+        res: List[GroundAtom] = list(self._markers)
+        for term in included:
+            res.append(self._nodes[term])
+            hidden = 0
+            for link in self.links(term):
+                if (
+                    link.arguments[1] in included
+                    or link.arguments[1] not in self._nodes
+                ):
+                    res.append(link)
+            for child in self.children(term):
+                if child not in included:
+                    hidden += 1
+            if hidden:
+                res.append(
+                    GroundAtom(
+                        clingo.Function(TRUNCATED, [term, clingo.Number(hidden)])
+                    )
+                )
+        return Model.of_elements(res, sort=False)
@@ -0,0 +1,228 @@
+"""
+One explanation graph for many atoms, in which shared subexplanations are stored and computed once.
+
+The atoms are explained in turn against the same Herbrand base and Explainer, and their graphs are merged
+into a MergedGraph with a single node per atom. An atom that is already justified in the merged graph (not
+just assumed) is not explained again, and a node of a new graph whose atom is already justified is not
+added: the new graph links to the existing node instead, so that the merged graph grows with the union of
+the explanations rather than with their sum. The new nodes that the query does not reach through new links
+are dropped, so that every node is a query or the target of a link.
+
+Existing nodes never get new links, except assumed atoms that a later graph justifies when that does not
+close a cycle, so that the merged graph stays acyclic.
+"""
+
+import functools
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+from . import cached_explanation, explainer_of, herbrand_base_of
+from .explanation import INCOMPLETE
+from .utils.profile import stage
+
+__all__ = ["MergedGraph", "explain_all", "select_atoms"]
+
+
+def _is_none(symbol: clingo.Symbol) -> bool:
+    return str(symbol).strip('"') == "None"
+
+
+def _is_assumption(node: GroundAtom) -> bool:
+    reason = node.arguments[2]
+    return bool(reason.arguments) and reason.arguments[0].name == "assumption"
+
+
+def select_atoms(answer_set: Model, patterns: Iterable[str]) -> Model:
+    """
+    Return the atoms of the answer set whose predicate matches one of the patterns, ``name/arity`` or ``name``.
+    """
+    selected = set()
+    for pattern in patterns:
+        name, _, arity = pattern.partition("/")
+        selected.add((name, int(arity) if arity else None))
+    return Model.of_atoms(
+        atom
+        for atom in answer_set
+        if (atom.predicate_name, len(atom.arguments)) in selected
+        or (atom.predicate_name, None) in selected
+    )
+
+
+class MergedGraph:
+    """
+    Union of explanation graphs (models of node/3 and link/3 atoms), with one node per atom.
+    """
+
+    def __init__(self):
+        self._nodes: Dict[clingo.Symbol, GroundAtom] = {}
+        self._links: Dict[clingo.Symbol, List[GroundAtom]] = {}
+        self._markers: Dict[GroundAtom, None] = {}
+        self.explained: List[Model] = []
+        self.reused: List[Model] = []
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def justified(self, atom: GroundAtom) -> bool:
+        """
+        Return True if the atom has a node in the graph, with a reason other than being assumed.
+        """
+        node = self._nodes.get(clingo.String(str(atom)))
+        return node is not None and not _is_assumption(node)
+
+    def _reaches(self, sources: Iterable[clingo.Symbol], target: clingo.Symbol) -> bool:
+        stack = list(sources)
+        visited = set()
+        while stack:
+            term = stack.pop()
+            if term == target:
+                return True
+            if term in visited:
+                continue
+            visited.add(term)
+            stack.extend(link.arguments[1] for link in self._links.get(term, ()))
+        return False
+
+    def _reached(
+        self, sources: Iterable[clingo.Symbol], within: Set[clingo.Symbol]
+    ) -> Set[clingo.Symbol]:
+        # the nodes of within reached from the sources, following only the links of the sources and of within
+        stack = list(sources)
+        starts = set(stack)
+        visited: Set[clingo.Symbol] = set()
+        while stack:
+            term = stack.pop()
+            if term in visited or (term not in within and term not in starts):
+                continue
+            visited.add(term)
+            stack.extend(link.arguments[1] for link in self._links.get(term, ()))
+        return visited
+
+    def add(self, graph: Iterable[GroundAtom], query: Iterable[GroundAtom]) -> None:
+        """
+        Merge the graph of the query, keeping the nodes (and their links) already in the merged graph.
+
+        Only the new nodes reachable from the query through the kept links are added; an incomplete graph, in
+        which the query may have no node, is reached from its nodes that no link points to.
+        """
+        nodes: Dict[clingo.Symbol, GroundAtom] = {}
+        links: Dict[clingo.Symbol, List[GroundAtom]] = {}
+        for atom in graph:
+            if atom.predicate_name == "node" and not _is_none(atom.arguments[0]):
+                nodes[atom.arguments[0]] = atom
+            elif atom.predicate_name == "link" and not _is_none(atom.arguments[1]):
+                links.setdefault(atom.arguments[0], []).append(atom)
+            elif atom.predicate_name == INCOMPLETE:
+                self._markers[atom] = None
+        roots = [
+            term
+            for term in (clingo.String(str(atom)) for atom in query)
+            if term in nodes
+        ]
+        if not roots:
+            pointed = {link.arguments[1] for group in links.values() for link in group}
+            roots = [term for term in nodes if term not in pointed]
+        added = []
+        replaced = []
+        for term, node in nodes.items():
+            existing = self._nodes.get(term)
+            if existing is None:
+                self._nodes[term] = node
+                self._links[term] = links.get(term, [])
+                added.append(term)
+            elif _is_assumption(existing) and not _is_assumption(node):
+                replaced.append(term)
+        # an assumed atom is justified by the new graph unless its reasons already depend on it
+        justified = []
+        for term in replaced:
+            targets = [
+                link.arguments[1]
+                for link in links.get(term, ())
+                if link.arguments[1] != term
+            ]
+            if not self._reaches(targets, term):
+                self._nodes[term] = nodes[term]
+                self._links[term] = links.get(term, [])
+                justified.append(term)
+        # the added nodes are reached from the query or from the justified ones, whose links are new
+        reached = self._reached([*roots, *justified], set(added))
+        for term in added:
+            if term not in reached:
+                del self._nodes[term]
+                del self._links[term]
+
+    def to_model(self) -> Model:
+        """
+        Return the merged graph, as a model of node/3 and link/3 atoms.
+        """
+        res: List[GroundAtom] = list(self._markers)
+        for term, node in self._nodes.items():
+            res.append(node)
+            res.extend(self._links[term])
+        return Model.of_elements(res, sort=False)
+
+
+def explain_all(
+    program: SymbolicProgram,
+    answer_set: Model,
+    atoms: Sequence[GroundAtom],
+    explicitly_mentioned_atoms: Model,
+    move_before: Sequence[str] = (),
+    cache=None,
+    explanation_cache=None,
+    timeout: Optional[float] = None,
+    ground_program_cache=None,
+    arguments: Sequence[str] = (),
+) -> MergedGraph:
+    """
+    Explain the atoms in turn into a single MergedGraph, skipping the atoms already justified by the graphs
+    of the previous ones.
+
+    The Herbrand base (with all the atoms) and the Explainer are computed once; caches, timeout and clingo
+    arguments are used as in explain_batch.
+    """
+    atoms = list(atoms)
+    herbrand_base = herbrand_base_of(
+        program,
+        answer_set,
+        Model.of_atoms(*atoms, sort=False),
+        explicitly_mentioned_atoms,
+        move_before,
+        cache,
+        arguments,
+    )
+    explainer = None
+
+    def compute(query):
+        nonlocal explainer
+        if explainer is None:
+            explainer = explainer_of(
+                program, herbrand_base, ground_program_cache, arguments
+            )
+        with stage("explanation graph"):
+            return explainer.explain(answer_set, query, timeout=timeout)
+
+    merged = MergedGraph()
+    for atom in atoms:
+        query = Model.of_atoms(atom)
+        if merged.justified(atom):
+            merged.reused.append(query)
+            continue
+        graph = cached_explanation(
+            explanation_cache,
+            program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            herbrand_base,
+            functools.partial(compute, query),
+            arguments,
+        )
+        with stage("merge graph"):
+            merged.add(graph, query)
+        merged.explained.append(query)
+    return merged
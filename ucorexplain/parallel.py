@@ -0,0 +1,151 @@
+"""
+Explanation of independent queries on a pool of processes.
+
+Program, answer set and Herbrand base are sent to each worker once, when the worker starts; tasks only carry
+the query and results only carry the atoms of the graph.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+from . import cached_explanation, explainer_of, herbrand_base_of
+
+__all__ = ["explain_parallel"]
+
+# state of the worker process, set by _initialize
+_worker: dict = {}
+
+
+def _atoms(strings: Sequence[str]) -> tuple[GroundAtom, ...]:
+    return tuple(GroundAtom(clingo.parse_term(string)) for string in strings)
+
+
+def _initialize(
+    program: str,
+    answer_set: str,
+    herbrand_base: Sequence[str],
+    explicitly_mentioned_atoms: str,
+    move_before: Sequence[str],
+    cache,
+    explanation_cache,
+    timeout: Optional[float],
+    ground_program_cache,
+    arguments: Sequence[str],
+) -> None:
+    herbrand_base = _atoms(herbrand_base)
+    _worker.clear()
+    _worker.update(
+        program=SymbolicProgram.parse(program),
+        answer_set=Model.of_program(answer_set),
+        herbrand_base=herbrand_base,
+        known_atoms=set(herbrand_base),
+        explicitly_mentioned_atoms=Model.of_program(explicitly_mentioned_atoms),
+        move_before=move_before,
+        cache=cache,
+        explanation_cache=explanation_cache,
+        timeout=timeout,
+        ground_program_cache=ground_program_cache,
+        arguments=arguments,
+        explainer=None,
+    )
+
+
+def _compute(query: Model, herbrand_base) -> Model:
+    if herbrand_base is _worker["herbrand_base"]:
+        if _worker["explainer"] is None:
+            _worker["explainer"] = explainer_of(
+                _worker["program"],
+                herbrand_base,
+                _worker["ground_program_cache"],
+                _worker["arguments"],
+            )
+        explainer = _worker["explainer"]
+    else:
+        explainer = explainer_of(
+            _worker["program"],
+            herbrand_base,
+            _worker["ground_program_cache"],
+            _worker["arguments"],
+        )
+    return explainer.explain(_worker["answer_set"], query, timeout=_worker["timeout"])
+
+
+def _explain(query: str) -> list[str]:
+    query = Model.of_program(query)
+    herbrand_base = _worker["herbrand_base"]
+    if any(atom not in _worker["known_atoms"] for atom in query):
+        herbrand_base = herbrand_base_of(
+            _worker["program"],
+            _worker["answer_set"],
+            query,
+            _worker["explicitly_mentioned_atoms"],
+            _worker["move_before"],
+            _worker["cache"],
+            _worker["arguments"],
+        )
+    graph = cached_explanation(
+        _worker["explanation_cache"],
+        _worker["program"],
+        _worker["answer_set"],
+        query,
+        _worker["explicitly_mentioned_atoms"],
+        herbrand_base,
+        lambda: _compute(query, herbrand_base),
+        _worker["arguments"],
+    )
+    return [str(atom) for atom in graph]
+
+
+def explain_parallel(
+    program: SymbolicProgram,
+    answer_set: Model,
+    queries: Sequence[Model],
+    explicitly_mentioned_atoms: Model,
+    move_before: Sequence[str] = (),
+    cache=None,
+    jobs: Optional[int] = None,
+    explanation_cache=None,
+    timeout: Optional[float] = None,
+    ground_program_cache=None,
+    arguments: Sequence[str] = (),
+    herbrand_base: Optional[Sequence[GroundAtom]] = None,
+):
+    """
+    Explain the queries on a pool of jobs processes, yielding pairs (query, graph) in the order of the queries.
+
+    The graphs are the same computed by explain_batch, and the Herbrand base is computed unless given, as there.
+    """
+    if herbrand_base is None:
+        herbrand_base = herbrand_base_of(
+            program,
+            answer_set,
+            Model.of_atoms(),
+            explicitly_mentioned_atoms,
+            move_before,
+            cache,
+            arguments,
+        )
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_initialize,
+        initargs=(
+            str(program),
+            answer_set.as_facts,
+            [str(atom) for atom in herbrand_base],
+            explicitly_mentioned_atoms.as_facts,
+            list(move_before),
+            cache,
+            explanation_cache,
+            timeout,
+            ground_program_cache,
+            list(arguments),
+        ),
+    ) as executor:
+        graphs = executor.map(_explain, [query.as_facts for query in queries])
+        for query, graph in zip(queries, graphs):
+            yield query, Model.of_elements(_atoms(graph), sort=False)
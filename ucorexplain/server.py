@@ -0,0 +1,285 @@
+"""
+Resident explanation server answering JSON requests against a loaded program.
+
+Each request is a JSON object on a single line, for example::
+
+    {"id": 1, "query": "p(a).", "answer": "s(a,b). s(b,a). p(a). r(a)."}
+
+The optional keys ``answer``, ``false``, ``move_before`` and ``timeout`` (in seconds) default to the values given
+on the command line; a graph whose computation hit the timeout contains an atom ``incomplete(reason)``.
+With ``depth``, ``max_nodes`` or ``expand`` (a list of atoms), only that part of the graph is returned, as by
+LazyExplanation.to_model; recent complete graphs are kept, so that expanding a node of a graph already computed
+does not explain the query again.
+Each response is a JSON object on a single line with the same ``id`` and either the ``graph`` (a list of atoms)
+or an ``error`` message. Responses may arrive in a different order than the requests.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socketserver
+import stat
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+from . import cached_explanation, explainer_of, herbrand_base_of
+from .explanation import LazyExplanation, incomplete
+
+__all__ = ["ExplanationServer", "is_stale_socket"]
+
+MAX_CACHED_HERBRAND_BASES = 16
+MAX_CACHED_EXPLAINERS = 4
+MAX_CACHED_GRAPHS = 16
+BUDGET_KEYS = ("depth", "max_nodes", "expand")
+
+
+def is_stale_socket(socket_path: str) -> bool:
+    """
+    Return True if socket_path is a socket, False if it does not exist; raise FileExistsError for other files.
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{socket_path} exists and is not a socket")
+    return True
+
+
+class ExplanationServer:
+    """
+    Keep a program and its Herbrand bases in memory and explain queries against them.
+
+    Requests leading to the same Herbrand base share an Explainer, so that they only swap answer set and query.
+    Requests on the same Explainer are handled one at a time.
+    """
+
+    def __init__(
+        self,
+        program: SymbolicProgram,
+        answer: str = "",
+        false: str = "",
+        move_before: Sequence[str] = (),
+        workers: int = 1,
+        cache=None,
+        explanation_cache=None,
+        timeout: Optional[float] = None,
+        ground_program_cache=None,
+        arguments: Sequence[str] = (),
+    ):
+        self.program = program
+        self.cache = cache
+        self.explanation_cache = explanation_cache
+        self.ground_program_cache = ground_program_cache
+        self.arguments = list(arguments)
+        self.defaults = {
+            "answer": answer,
+            "false": false,
+            "move_before": list(move_before),
+            "timeout": timeout,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._herbrand_bases: OrderedDict = OrderedDict()
+        self._explainers: OrderedDict = OrderedDict()
+        self._graphs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _herbrand_base(
+        self,
+        answer_set: Model,
+        explicitly_mentioned_atoms: Model,
+        move_before: Sequence[str],
+    ):
+        key = (
+            answer_set.as_facts,
+            explicitly_mentioned_atoms.as_facts,
+            tuple(move_before),
+        )
+        with self._lock:
+            if key in self._herbrand_bases:
+                self._herbrand_bases.move_to_end(key)
+                return self._herbrand_bases[key]
+        herbrand_base = herbrand_base_of(
+            self.program,
+            answer_set,
+            Model.of_atoms(),
+            explicitly_mentioned_atoms,
+            move_before,
+            self.cache,
+            self.arguments,
+        )
+        value = (herbrand_base, set(herbrand_base))
+        with self._lock:
+            self._herbrand_bases[key] = value
+            while len(self._herbrand_bases) > MAX_CACHED_HERBRAND_BASES:
+                self._herbrand_bases.popitem(last=False)
+        return value
+
+    def _explainer(self, herbrand_base):
+        with self._lock:
+            if herbrand_base in self._explainers:
+                self._explainers.move_to_end(herbrand_base)
+                return self._explainers[herbrand_base]
+        explainer = explainer_of(
+            self.program, herbrand_base, self.ground_program_cache, self.arguments
+        )
+        value = (explainer, threading.Lock())
+        with self._lock:
+            value = self._explainers.setdefault(herbrand_base, value)
+            while len(self._explainers) > MAX_CACHED_EXPLAINERS:
+                self._explainers.popitem(last=False)
+        return value
+
+    def explain(self, request: dict) -> Model:
+        """
+        Compute the explanation graph for a request.
+        """
+        if "query" not in request:
+            raise ValueError("missing query")
+        request = {**self.defaults, **request}
+        answer_set = Model.of_program(request["answer"])
+        explicitly_mentioned_atoms = Model.of_program(request["false"])
+        query = Model.of_program(request["query"])
+        move_before = request["move_before"]
+
+        herbrand_base, known_atoms = self._herbrand_base(
+            answer_set, explicitly_mentioned_atoms, move_before
+        )
+        if any(atom not in known_atoms for atom in query):
+            herbrand_base = herbrand_base_of(
+                self.program,
+                answer_set,
+                query,
+                explicitly_mentioned_atoms,
+                move_before,
+                self.cache,
+                self.arguments,
+            )
+
+        def compute():
+            explainer, lock = self._explainer(herbrand_base)
+            with lock:
+                return explainer.explain(answer_set, query, timeout=request["timeout"])
+
+        return cached_explanation(
+            self.explanation_cache,
+            self.program,
+            answer_set,
+            query,
+            explicitly_mentioned_atoms,
+            herbrand_base,
+            compute,
+            self.arguments,
+        )
+
+    def explanation(self, request: dict) -> LazyExplanation:
+        """
+        Return the graph of a request for on-demand expansion, reusing the one of an identical request.
+
+        Incomplete graphs are not kept, so that a later request with a larger timeout explains the query again.
+        """
+        request = {**self.defaults, **request}
+        key = json.dumps(
+            [request.get(name) for name in ("answer", "false", "query", "move_before")]
+        )
+        with self._lock:
+            if key in self._graphs:
+                self._graphs.move_to_end(key)
+                return self._graphs[key]
+        graph = self.explain(request)
+        value = LazyExplanation(graph, Model.of_program(request["query"]))
+        if incomplete(graph) is not None:
+            return value
+        with self._lock:
+            self._graphs[key] = value
+            while len(self._graphs) > MAX_CACHED_GRAPHS:
+                self._graphs.popitem(last=False)
+        return value
+
+    def handle(self, line: str) -> dict:
+        """
+        Answer a single request given as a JSON line.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+            request_id = request.get("id")
+            if any(key in request for key in BUDGET_KEYS):
+                graph = self.explanation(request).to_model(
+                    request.get("depth"),
+                    request.get("max_nodes"),
+                    request.get("expand", ()),
+                )
+            else:
+                graph = self.explain(request)
+            return {"id": request_id, "graph": [str(atom) for atom in graph]}
+        except Exception as e:  # pylint: disable=broad-except
+            return {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+
+    def serve_stream(self, instream, outstream) -> None:
+        """
+        Read requests line by line and write responses as they are completed.
+        """
+        write_lock = threading.Lock()
+
+        def respond(line):
+            response = self.handle(line)
+            with write_lock:
+                outstream.write(json.dumps(response) + "\n")
+                outstream.flush()
+
+        # only the requests still in progress are kept, so that a long-lived connection does not grow
+        pending: set = set()
+        for line in instream:
+            if not line.strip():
+                continue
+            pending.add(self._executor.submit(respond, line))
+            for future in [future for future in pending if future.done()]:
+                pending.remove(future)
+                future.result()
+        for future in pending:
+            future.result()
+
+    def serve_stdio(self) -> None:
+        """
+        Serve requests from stdin until it is closed.
+        """
+        self.serve_stream(sys.stdin, sys.stdout)
+
+    def serve_unix_socket(self, socket_path: str) -> None:
+        """
+        Serve requests from clients connecting to a Unix socket, one request per line.
+
+        A socket left at socket_path by an earlier server is replaced; any other file is an error.
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                server.serve_stream(
+                    io.TextIOWrapper(self.rfile, encoding="utf-8"),
+                    io.TextIOWrapper(self.wfile, encoding="utf-8", write_through=True),
+                )
+
+        if is_stale_socket(socket_path):
+            os.unlink(socket_path)
+        with socketserver.ThreadingUnixStreamServer(
+            socket_path, Handler
+        ) as unix_server:
+            try:
+                unix_server.serve_forever()
+            finally:
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(socket_path)
+
+    def close(self) -> None:
+        self._executor.shutdown()
@@ -0,0 +1,169 @@
+"""
+Query-relevance slicing of a program and of its Herbrand base.
+
+The atoms of the Herbrand base are connected if they occur in the same ground instance of a rule, whatever
+the direction of the dependency: with the answer set assumed, propagation goes from bodies to heads and
+back. Atoms in other connected components than the query (and the explicitly mentioned atoms) cannot take
+part in its explanation, since any minimal unsatisfiable set of rules and assumptions lies in one component;
+they are left out, together with the rules that have no instance in the slice.
+
+The ground instances are read from clingo with every head turned into a choice, so that no atom is a fact
+and no body literal is simplified away; the grounding follows the one done for the explanation, where
+variables range over the Herbrand base. Instances whose body does not depend on the Herbrand base are
+grounded in any case: those that are not facts or choices keep their component in the slice, so that the
+sliced program is satisfiable whenever the whole one is.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+from dumbo_asp.primitives.programs import SymbolicProgram
+
+from .utils.control import control_arguments
+
+__all__ = ["Slice", "same_graph", "slice_program"]
+
+SELECTOR = re.compile(r"__pus__\((program|answer_set),\d+\)")
+
+
+@dataclass(frozen=True)
+class Slice:
+    """
+    The rules of a program and the atoms of its Herbrand base that can affect the query.
+    """
+
+    program: SymbolicProgram
+    herbrand_base: tuple[GroundAtom, ...]
+    total_rules: int
+    total_atoms: int
+
+
+class _Instances(clingo.Observer):
+    """
+    Join the atoms of each ground rule, and collect the rules that are grounded whatever the Herbrand base.
+    """
+
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+        self.rules: List[tuple[Sequence[int], Sequence[int]]] = []
+
+    def find(self, atom: int) -> int:
+        root = atom
+        while self.parent.get(root, root) != root:
+            root = self.parent[root]
+        while atom != root:
+            self.parent[atom], atom = root, self.parent[atom]
+        return root
+
+    def _join(self, atoms: Iterable[int]) -> None:
+        first = None
+        for atom in atoms:
+            root = self.find(atom)
+            if first is None:
+                first = root
+            elif root != first:
+                self.parent[root] = first
+
+    def rule(self, choice: bool, head: Sequence[int], body: Sequence[int]) -> None:
+        self._join([*head, *map(abs, body)])
+        self.rules.append((head, body))
+
+    def weight_rule(
+        self,
+        choice: bool,
+        head: Sequence[int],
+        lower_bound: int,
+        body: Sequence[tuple[int, int]],
+    ) -> None:
+        self._join([*head, *(abs(literal) for literal, _ in body)])
+        self.rules.append((head, [literal for literal, _ in body]))
+
+
+def _choice_program(program: SymbolicProgram) -> str:
+    lines = []
+    for rule in program:
+        body = rule.body_as_string()
+        head = "{" + "; ".join(rule.head_elements) + "}" if rule.head_elements else ""
+        lines.append(f"{head} :- {body}." if body else f"{head}.")
+    return "\n".join(lines)
+
+
+def slice_program(
+    program: SymbolicProgram,
+    herbrand_base: Sequence[GroundAtom],
+    query: Model,
+    explicitly_mentioned_atoms: Model = Model.of_atoms(),
+    arguments: Sequence[str] = (),
+) -> Slice:
+    """
+    Return the part of the program and of the Herbrand base (in its order) connected to the query
+    and to the explicitly mentioned atoms; the clingo arguments are passed to the control grounding it.
+    """
+    instances = _Instances()
+    control = clingo.Control(control_arguments(["--warn=none"], arguments))
+    control.register_observer(instances)
+    control.add("base", [], _choice_program(program))
+    with control.backend() as backend:
+        for atom in herbrand_base:
+            backend.add_rule([backend.add_atom(atom.value)], choice=True)
+    control.ground([("base", [])])
+
+    literals = {atom.symbol: atom.literal for atom in control.symbolic_atoms}
+    in_base = set(literals.values())
+    roots = {
+        instances.find(literals[atom.value])
+        for atom in [*query, *explicitly_mentioned_atoms]
+        if atom.value in literals
+    }
+    # rules grounded independently of the Herbrand base, other than facts and choices, stay satisfiable
+    # only with their whole component
+    for head, body in instances.rules:
+        if body and not any(literal > 0 and literal in in_base for literal in body):
+            atoms = [*head, *map(abs, body)]
+            roots.add(instances.find(atoms[0]))
+
+    kept = {
+        atom.symbol
+        for atom in control.symbolic_atoms
+        if instances.find(atom.literal) in roots
+    }
+    predicates = {(symbol.name, len(symbol.arguments)) for symbol in kept}
+    rules = []
+    for rule in program:
+        if not any((p.name, p.arity) in predicates for p in rule.predicates):
+            continue
+        if rule.is_fact:
+            atom = _ground_atom(rule.head_elements[0])
+            if atom is not None and atom not in kept:
+                continue
+        rules.append(rule)
+    return Slice(
+        program=SymbolicProgram.of(rules),
+        herbrand_base=tuple(atom for atom in herbrand_base if atom.value in kept),
+        total_rules=len(program),
+        total_atoms=len(herbrand_base),
+    )
+
+
+def _ground_atom(string: str):
+    try:
+        symbol = clingo.parse_term(string)
+    except RuntimeError:
+        return None
+    return symbol if symbol.type == clingo.SymbolType.Function else None
+
+
+def same_graph(graph: Iterable[GroundAtom], other: Iterable[GroundAtom]) -> bool:
+    """
+    Return True if the graphs have the same nodes and links, up to the numbering of the selectors,
+    which depends on the rules and atoms in the program and Herbrand base explained.
+    """
+
+    def normalized(atoms):
+        return {SELECTOR.sub(r"__pus__(\1)", str(atom)) for atom in atoms}
+
+    return normalized(graph) == normalized(other)
@@ -0,0 +1,201 @@
+"""
+Minimal unsatisfiable cores over the rules of a program.
+
+Every rule is guarded by a selector of RuleTransformer, and the program is grounded once. A set of rules is
+unsatisfiable (with the query forbidden) if solving under their selectors as assumptions fails; the other
+selectors are left free, so that supersets of an unsatisfiable set are unsatisfiable as well.
+A core read from clingo is then shrunk to a minimal one with one of the STRATEGIES.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+import clingo
+
+from .utils.transformer import RuleTransformer
+
+__all__ = ["Core", "CoreMinimizer", "STRATEGIES", "minimal_core"]
+
+
+@dataclass(frozen=True)
+class Core:
+    """
+    A minimal set of rules, given by their ids (starting from 1) and text, and the solver calls needed to find it.
+    """
+
+    rule_ids: tuple[int, ...]
+    rules: tuple[str, ...]
+    solver_calls: int
+    strategy: str
+
+
+class CoreMinimizer:
+    """
+    Find sets of rules of a program that entail the query, i.e., that are unsatisfiable once the query is forbidden.
+
+    Without query literals, the cores are the sets of rules without answer sets.
+    The true and false atoms (e.g., the rest of an answer set) are imposed by constraints outside of the cores.
+    """
+
+    def __init__(
+        self,
+        program: str,
+        query_literals: Sequence[str] = (),
+        arguments: Sequence[str] = (),
+        true_atoms: Sequence[str] = (),
+        false_atoms: Sequence[str] = (),
+    ):
+        self._transformer = RuleTransformer()
+        transformed = self._transformer.get_transformed(program)
+        self.rules = tuple(self._transformer.rules)
+        self.solver_calls = 0
+
+        self._control = clingo.Control(list(arguments))
+        self._control.add("base", [], transformed)
+        if query_literals:
+            self._control.add("base", [], f":- {', '.join(query_literals)}.")
+        self._control.add(
+            "base",
+            [],
+            "\n".join(
+                [f":- not {atom}." for atom in true_atoms]
+                + [f":- {atom}." for atom in false_atoms]
+            ),
+        )
+        self._control.ground([("base", [])])
+
+        self._literal: Dict[int, int] = {}
+        for rule_id in range(1, len(self.rules) + 1):
+            atom = self._control.symbolic_atoms[self._transformer.get_symbol(rule_id)]
+            # selectors of rules whose body is false at grounding time are removed by clingo
+            literal = atom.literal if atom is not None else 0
+            self._literal[rule_id] = literal
+
+    def _assumptions(self, rule_ids: Sequence[int]) -> List[int]:
+        return [
+            self._literal[rule_id] for rule_id in rule_ids if self._literal[rule_id]
+        ]
+
+    def core(self, rule_ids: Sequence[int]):
+        """
+        Solve with the given rules; return None if satisfiable, and a subset of them that is unsatisfiable otherwise.
+        """
+        self.solver_calls += 1
+        core: List[int] = []
+        assumptions = self._assumptions(rule_ids)
+        result = self._control.solve(assumptions=assumptions, on_core=core.extend)
+        if not result.unsatisfiable:
+            return None
+        in_core = set(core)
+        return [
+            rule_id
+            for rule_id in rule_ids
+            if self._literal[rule_id] and self._literal[rule_id] in in_core
+        ]
+
+    def unsatisfiable(self, rule_ids: Sequence[int]) -> bool:
+        return self.core(rule_ids) is not None
+
+    def deletion(self, rule_ids: Sequence[int]) -> List[int]:
+        """
+        Try to drop the rules one at a time, keeping the (smaller) core of each failed attempt.
+        """
+        core = list(rule_ids)
+        index = 0
+        while index < len(core):
+            candidate = self.core(core[:index] + core[index + 1 :])
+            if candidate is None:
+                index += 1
+            else:
+                position = {rule_id: i for i, rule_id in enumerate(core)}
+                core = candidate
+                index = sum(1 for rule_id in core if position[rule_id] < index)
+        return core
+
+    def quickxplain(self, rule_ids: Sequence[int]) -> List[int]:
+        """
+        Divide and conquer as in QuickXplain (Junker, 2004); few solver calls when the core is small.
+        """
+
+        def explain(
+            background: List[int], changed: bool, rules: List[int]
+        ) -> List[int]:
+            if changed and self.unsatisfiable(background):
+                return []
+            if len(rules) == 1:
+                return rules
+            half = len(rules) // 2
+            first, second = rules[:half], rules[half:]
+            second_core = explain(background + first, bool(first), second)
+            first_core = explain(background + second_core, bool(second_core), first)
+            return first_core + second_core
+
+        if not rule_ids or self.unsatisfiable([]):
+            return []
+        return explain([], False, list(rule_ids))
+
+    def progression(self, rule_ids: Sequence[int]) -> List[int]:
+        """
+        Find the rules of the core one at a time as the shortest unsatisfiable prefix of the remaining rules,
+        with an exponential search followed by a binary search (Marques-Silva et al., 2013).
+        """
+        core: List[int] = []
+        remaining = list(rule_ids)
+        while remaining and not self.unsatisfiable(core):
+            size = 1
+            while size < len(remaining) and not self.unsatisfiable(
+                core + remaining[:size]
+            ):
+                size *= 2
+            size = min(size, len(remaining))
+            low, high = size // 2 + 1, size
+            while low < high:
+                middle = (low + high) // 2
+                if self.unsatisfiable(core + remaining[:middle]):
+                    high = middle
+                else:
+                    low = middle + 1
+            core.append(remaining[low - 1])
+            remaining = remaining[: low - 1]
+        return core
+
+    def minimal_core(self, strategy: str = "deletion") -> Core:
+        """
+        Solve once under all the rules and shrink the core read from clingo with the given strategy.
+
+        Raises ValueError if the query is not entailed, i.e., if there is no core.
+        """
+        self.solver_calls = 0
+        core = self.core(list(range(1, len(self.rules) + 1)))
+        if core is None:
+            raise ValueError("the program with the query forbidden is satisfiable")
+        core = sorted(STRATEGIES[strategy](self, core))
+        return Core(
+            rule_ids=tuple(core),
+            rules=tuple(self.rules[rule_id - 1] for rule_id in core),
+            solver_calls=self.solver_calls,
+            strategy=strategy,
+        )
+
+
+STRATEGIES: Dict[str, Callable[[CoreMinimizer, Sequence[int]], List[int]]] = {
+    "deletion": CoreMinimizer.deletion,
+    "quickxplain": CoreMinimizer.quickxplain,
+    "progression": CoreMinimizer.progression,
+}
+
+
+def minimal_core(
+    program: str,
+    query_literals: Sequence[str] = (),
+    strategy: str = "deletion",
+    arguments: Sequence[str] = (),
+    true_atoms: Sequence[str] = (),
+    false_atoms: Sequence[str] = (),
+) -> Core:
+    """
+    Return a minimal set of rules of the program entailing the query literals.
+    """
+    return CoreMinimizer(
+        program, query_literals, arguments, true_atoms, false_atoms
+    ).minimal_core(strategy)
@@ -0,0 +1,239 @@
+"""
+Compact binary format for explanation graphs that can be memory-mapped.
+
+All integers are unsigned 32 bit little-endian. The file contains, in this order:
+
+- the header: magic ``UCXG``, version, number of strings, nodes and links, and the reason why the graph is
+  incomplete (see ucorexplain.explanation);
+- the offsets of the strings in the string blob (one more than the number of strings);
+- the nodes, as records (atom, value, reason, rule, extra) of string ids followed by the number of reasons
+  hidden by truncated/2;
+- the links, as records (source, target, rule) of string ids;
+- the string blob (UTF-8).
+
+Missing fields of a node reason (e.g. the rule of an assumption), the reason of a complete graph and the
+hidden reasons of a node that is not truncated are stored as ``NONE``.
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from typing import Iterator, Optional, Union
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+from ..explanation import INCOMPLETE, TRUNCATED
+
+__all__ = ["GraphFile", "dump"]
+
+MAGIC = b"UCXG"
+VERSION = 2
+HEADER = struct.Struct("<4sIIIII")
+NODE_FIELDS = 6
+LINK_FIELDS = 3
+NONE = 0xFFFFFFFF
+
+
+def _u32(values) -> array:
+    res = array("I", values)
+    if sys.byteorder != "little":  # nocoverage
+        res.byteswap()
+    return res
+
+
+def dump(graph, file_name: str) -> None:
+    """
+    Save a graph of node/3 and link/3 atoms, with its truncated/2 and incomplete/1 atoms, in the binary format.
+    """
+    graph = list(graph)
+    ids: dict[str, int] = {}
+    strings: list[bytes] = []
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value.encode())
+        return ids[value]
+
+    hidden = {
+        atom.arguments[0]: atom.arguments[1].number
+        for atom in graph
+        if atom.predicate_name == TRUNCATED
+    }
+    marker = NONE
+    nodes: list[int] = []
+    links: list[int] = []
+    for atom in graph:
+        if atom.predicate_name == INCOMPLETE:
+            marker = intern(str(atom.arguments[0]))
+        elif atom.predicate_name == "node":
+            name, value, reason = atom.arguments
+            fields = reason.arguments
+            nodes.extend(
+                (
+                    intern(name.string),
+                    1 if value.name == "true" else 0,
+                    intern(str(fields[0])),
+                    intern(fields[1].string if len(fields) > 1 else None),
+                    intern(str(fields[2]) if len(fields) > 2 else None),
+                    hidden.get(name, NONE),
+                )
+            )
+        elif atom.predicate_name == "link":
+            links.extend(intern(argument.string) for argument in atom.arguments)
+
+    offsets = [0]
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+
+    with open(file_name, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(strings),
+                len(nodes) // NODE_FIELDS,
+                len(links) // LINK_FIELDS,
+                marker,
+            )
+        )
+        f.write(_u32(offsets).tobytes())
+        f.write(_u32(nodes).tobytes())
+        f.write(_u32(links).tobytes())
+        f.write(b"".join(strings))
+
+
+class GraphFile:
+    """
+    A memory-mapped explanation graph; strings are decoded only when accessed.
+    """
+
+    def __init__(self, file_name: str):
+        with open(file_name, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, strings, nodes, links, marker = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{file_name} is not a graph file of version {VERSION}")
+        self.number_of_strings = strings
+        self.number_of_nodes = nodes
+        self.number_of_links = links
+
+        start = HEADER.size
+        end = start + 4 * (strings + 1 + nodes * NODE_FIELDS + links * LINK_FIELDS)
+        integers: Union[memoryview, array]
+        if sys.byteorder == "little":
+            integers = memoryview(self._mmap)[start:end].cast("I")
+        else:  # nocoverage
+            integers = array("I", self._mmap[start:end])
+            integers.byteswap()
+        self._integers = integers
+        self._offsets = integers[: strings + 1]
+        self._nodes = integers[strings + 1 : strings + 1 + nodes * NODE_FIELDS]
+        self._links = integers[strings + 1 + nodes * NODE_FIELDS :]
+        self._blob = end
+        self.incomplete = self.string(marker)
+
+    def close(self) -> None:
+        for view in (self._offsets, self._nodes, self._links, self._integers):
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "GraphFile":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def string(self, index: int) -> Optional[str]:
+        if index == NONE:
+            return None
+        start = self._blob + self._offsets[index]
+        end = self._blob + self._offsets[index + 1]
+        return self._mmap[start:end].decode()
+
+    def node(self, index: int) -> tuple:
+        """
+        Return the node at the given index as (atom, value, reason, rule, extra, hidden), hidden being None
+        if the node is not truncated.
+        """
+        fields = self._nodes[index * NODE_FIELDS : (index + 1) * NODE_FIELDS]
+        return (
+            self.string(fields[0]),
+            bool(fields[1]),
+            self.string(fields[2]),
+            self.string(fields[3]),
+            self.string(fields[4]),
+            None if fields[5] == NONE else fields[5],
+        )
+
+    def link(self, index: int) -> tuple:
+        """
+        Return the link at the given index as (source, target, rule).
+        """
+        fields = self._links[index * LINK_FIELDS : (index + 1) * LINK_FIELDS]
+        return tuple(self.string(field) for field in fields)
+
+    def nodes(self) -> Iterator[tuple]:
+        return (self.node(index) for index in range(self.number_of_nodes))
+
+    def links(self) -> Iterator[tuple]:
+        return (self.link(index) for index in range(self.number_of_links))
+
+    def to_model(self) -> Model:
+        """
+        Rebuild the graph as node/3 and link/3 atoms, with its truncated/2 and incomplete/1 atoms.
+        """
+        res = []
+        if self.incomplete is not None:
+            res.append(
+                GroundAtom(
+                    clingo.Function(INCOMPLETE, [clingo.Function(self.incomplete)])
+                )
+            )
+        for source, target, rule in self.links():
+            res.append(
+                GroundAtom(
+                    clingo.Function(
+                        "link",
+                        [
+                            clingo.String(source),
+                            clingo.String(target),
+                            clingo.String(rule),
+                        ],
+                    )
+                )
+            )
+        for atom, value, reason, rule, extra, hidden in self.nodes():
+            fields = [clingo.Function(reason)]
+            if rule is not None:
+                fields.append(clingo.String(rule))
+            if extra is not None:
+                fields.append(clingo.parse_term(extra))
+            res.append(
+                GroundAtom(
+                    clingo.Function(
+                        "node",
+                        [
+                            clingo.String(atom),
+                            clingo.Function("true" if value else "false"),
+                            clingo.Tuple_(fields),
+                        ],
+                    )
+                )
+            )
+            if hidden is not None:
+                res.append(
+                    GroundAtom(
+                        clingo.Function(
+                            TRUNCATED, [clingo.String(atom), clingo.Number(hidden)]
+                        )
+                    )
+                )
+        return Model.of_elements(res, sort=False)
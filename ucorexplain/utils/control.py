@@ -0,0 +1,37 @@
+"""
+Arguments of the clingo controls created by the pipeline.
+
+Every control has arguments of its own (e.g., the number of models) and receives the clingo arguments given
+by the user (e.g., ``--parallel-mode=4`` or ``--configuration=trendy``); a user argument replaces the default
+for the same option, since clingo rejects options given twice.
+"""
+
+import shlex
+from typing import Iterable, List, Sequence
+
+__all__ = ["control_arguments", "split_arguments"]
+
+
+def _option(argument: str) -> str:
+    if argument.isdigit():
+        return "--models"
+    return argument.split("=", 1)[0]
+
+
+def control_arguments(defaults: Sequence[str], arguments: Sequence[str]) -> List[str]:
+    """
+    Return the defaults not overridden by the arguments, followed by the arguments.
+
+    Options must be written as ``--option=value``; a bare number is the number of models.
+    """
+    overridden = {_option(argument) for argument in arguments}
+    return [
+        argument for argument in defaults if _option(argument) not in overridden
+    ] + list(arguments)
+
+
+def split_arguments(strings: Iterable[str]) -> List[str]:
+    """
+    Split strings of arguments as a shell would, e.g., ``["--parallel-mode=4 --opt-mode=opt"]``.
+    """
+    return [argument for string in strings for argument in shlex.split(string)]
@@ -0,0 +1,263 @@
+"""
+Structure of explanation graphs for clingraph, computed in Python in linear time.
+
+The encodings in ucorexplain/encodings only style the graph; they receive the facts
+
+- ``node(N)`` and ``edge((N,M))``: the elements of the graph;
+- ``kind(N,K)``: ``false``, ``true``, ``fact`` or ``assumption``, for the fill color;
+- ``label(N,Name,Reason,Rule)``: the strings shown in a node, and ``edge_rule(E,Rule)`` for edges whose
+  rule is not the one of their source;
+- ``main(N)``: in trees, the copy of an atom that is expanded (drawn with a border);
+- ``hidden(N)``: nodes initially hidden in the SVG, i.e., all but the roots;
+- ``linked(T,E,N)``: element E of type T is revealed by clicking on node N.
+
+In a tree, each atom has a copy (atom,parent) for every parent, and (atom,root) if it has no parent.
+"""
+
+import base64
+from typing import Dict, List, Optional, Tuple
+
+import clingo
+from dumbo_asp.primitives.rules import SymbolicRule
+
+__all__ = ["chop_rule", "layout_facts"]
+
+REASONS = {
+    "assumption": "Assumption",
+    "head_upper_bound": "Upper bound was already reacheded",
+    "lack_of_support": "No rule can support",
+    "last_support": "No other rule can support ",
+    "constraint": "Avoid violation of rule",
+}
+ROOT = clingo.Function("root")
+
+
+def chop_rule(rule: str) -> str:
+    """
+    Return the rule as shown in the graph, with its body split over several lines.
+    """
+    return str(
+        SymbolicRule.parse(rule).with_chopped_body(
+            with_backward_search=True, backward_search_symbols=(";", " :-")
+        )
+    )
+
+
+class _Node:
+    __slots__ = ("value", "reason", "rule", "extra")
+
+    def __init__(
+        self, value: bool, reason: str, rule: Optional[str], extra: Optional[str]
+    ):
+        self.value = value
+        self.reason = reason
+        self.rule = rule
+        self.extra = extra
+
+
+def _text(symbol: clingo.Symbol) -> str:
+    return symbol.string if symbol.type == clingo.SymbolType.String else str(symbol)
+
+
+def _term(symbol: clingo.Symbol) -> clingo.Symbol:
+    return clingo.parse_term(symbol.string)
+
+
+def _read_model(graph):
+    """
+    Read a graph of node/3 and link/3 atoms with string arguments, as computed by the explainer.
+
+    Each distinct rule is chopped once.
+    """
+    chopped: Dict[str, str] = {}
+
+    def chop(rule: str) -> str:
+        if rule not in chopped:
+            chopped[rule] = chop_rule(rule)
+        return chopped[rule]
+
+    nodes: Dict[clingo.Symbol, _Node] = {}
+    links: List[Tuple[clingo.Symbol, clingo.Symbol, str]] = []
+    truncated: Dict[clingo.Symbol, int] = {}
+    for atom in graph:
+        arguments = atom.arguments
+        if atom.predicate_name == "node":
+            if _text(arguments[0]) == "None":
+                continue
+            fields = arguments[2].arguments
+            nodes[_term(arguments[0])] = _Node(
+                arguments[1].name == "true",
+                fields[0].name,
+                chop(fields[1].string) if len(fields) > 1 else None,
+                _text(fields[2]) if len(fields) > 2 else None,
+            )
+        elif atom.predicate_name == "link":
+            if _text(arguments[1]) == "None":
+                continue
+            links.append(
+                (
+                    _term(arguments[0]),
+                    _term(arguments[1]),
+                    chop(arguments[2].string),
+                )
+            )
+        elif atom.predicate_name == "truncated":
+            truncated[_term(arguments[0])] = arguments[1].number
+    return nodes, links, truncated
+
+
+def _read_file(file_name: str):
+    """
+    Read a graph saved by ucorexplain.save_graph, whose rules are base64 strings in rule/2.
+    """
+    control = clingo.Control(["--warn=none"])
+    control.load(file_name)
+    control.ground([("base", [])])
+    rules: Dict[clingo.Symbol, str] = {}
+    for atom in control.symbolic_atoms.by_signature("rule", 2):
+        number, encoded = atom.symbol.arguments
+        rules[number] = base64.b64decode(encoded.string).decode("ascii")
+    nodes: Dict[clingo.Symbol, _Node] = {}
+    for atom in control.symbolic_atoms.by_signature("node", 3):
+        name, value, reason = atom.symbol.arguments
+        fields = reason.arguments if reason.type == clingo.SymbolType.Function else []
+        kind = reason.name if reason.name else fields[0].name
+        nodes[name] = _Node(
+            value.name == "true",
+            kind,
+            rules[fields[1]] if reason.name == "" and len(fields) > 1 else None,
+            _text(fields[2]) if reason.name == "" and len(fields) > 2 else None,
+        )
+    links = [
+        (
+            atom.symbol.arguments[0],
+            atom.symbol.arguments[1],
+            rules[atom.symbol.arguments[2]],
+        )
+        for atom in control.symbolic_atoms.by_signature("link", 3)
+    ]
+    truncated = {
+        atom.symbol.arguments[0]: atom.symbol.arguments[1].number
+        for atom in control.symbolic_atoms.by_signature("truncated", 2)
+    }
+    return nodes, links, truncated
+
+
+def layout_facts(graph, tree: bool = False) -> str:
+    """
+    Return the facts read by the clingraph encodings for a graph, given as a model or a file written by save_graph.
+    """
+    nodes, links, truncated = (
+        _read_file(graph) if isinstance(graph, str) else _read_model(graph)
+    )
+    parents: Dict[clingo.Symbol, List[clingo.Symbol]] = {}
+    children: Dict[clingo.Symbol, List[Tuple[clingo.Symbol, str]]] = {}
+    for source, target, rule in links:
+        parents.setdefault(target, []).append(source)
+        if source != target:
+            children.setdefault(source, []).append((target, rule))
+    facts = {name for name in nodes if name not in children}
+    roots = {
+        name
+        for name in nodes
+        if not any(
+            parent != name and parent in nodes for parent in parents.get(name, ())
+        )
+    }
+
+    out: List[str] = []
+
+    def vertex(name: clingo.Symbol, vertex_id) -> None:
+        out.append(f"node({vertex_id}).\n")
+        label = str(name)
+        if name in truncated:
+            label += f" ({truncated[name]} hidden)"
+        node = nodes.get(name)
+        reason, rule = "", ""
+        if node is not None:
+            if not node.value:
+                kind = "false"
+            elif node.reason == "assumption":
+                kind = "assumption"
+            else:
+                kind = "fact" if name in facts else "true"
+            out.append(f"kind({vertex_id},{kind}).\n")
+            if node.reason == "support":
+                reason = "Fact" if name in facts else "Support"
+            else:
+                reason = REASONS.get(node.reason, "")
+                if node.reason == "last_support":
+                    reason += node.extra or ""
+            rule = node.rule or ""
+        out.append(
+            f"label({vertex_id},{clingo.String(label)},{clingo.String(reason)},{clingo.String(rule)}).\n"
+        )
+        if name not in roots:
+            out.append(f"hidden({vertex_id}).\n")
+
+    def edge(source_id, target_id, source: clingo.Symbol, rule: str) -> None:
+        edge_id = f"({source_id},{target_id})"
+        out.append(f"edge({edge_id}).\n")
+        node = nodes.get(source)
+        if node is None or node.rule != rule:
+            out.append(f"edge_rule({edge_id},{clingo.String(rule)}).\n")
+        out.append(f"linked(edge,{edge_id},{source_id}).\n")
+
+    if not tree:
+        for name in nodes:
+            vertex(name, name)
+            out.append(f"linked(node,{name},{name}).\n")
+        for source, target, rule in links:
+            out.append(f"linked(node,{target},{source}).\n")
+            if source != target:
+                edge(source, target, source, rule)
+        return "".join(out)
+
+    # copies (atom,parent) of each atom, and the main copies that are expanded
+    copies: Dict[clingo.Symbol, List[clingo.Symbol]] = {}
+    for name in roots:
+        copies.setdefault(name, []).append(ROOT)
+    for source, target, _ in links:
+        copies.setdefault(target, []).append(source)
+    for name, copy_parents in copies.items():
+        copies[name] = list(dict.fromkeys(copy_parents))
+    main: Dict[clingo.Symbol, List[clingo.Symbol]] = {}
+    for name, copy_parents in copies.items():
+        if name not in nodes:
+            continue
+        if name in facts:
+            main[name] = copy_parents
+            continue
+        selected = [ROOT] if name in roots else []
+        if name in parents:
+            selected.append(max(parents[name]))
+        main[name] = list(dict.fromkeys(selected))
+
+    for name, copy_parents in copies.items():
+        mains = main.get(name, [])
+        is_main = set(mains)
+        for parent in copy_parents:
+            vertex_id = f"({name},{parent})"
+            vertex(name, vertex_id)
+            # a copy that is not expanded reveals the main copies, and what they reveal
+            revealed = [vertex_id]
+            if parent in is_main:
+                out.append(f"main({vertex_id}).\n")
+            else:
+                revealed.extend(f"({name},{other})" for other in mains)
+            for element in revealed:
+                out.append(f"linked(node,{element},{vertex_id}).\n")
+    for name, mains in main.items():
+        is_main = set(mains)
+        others = [f"({name},{other})" for other in copies[name] if other not in is_main]
+        for parent in mains:
+            source_id = f"({name},{parent})"
+            triggers = [source_id] + others
+            for child, rule in children.get(name, ()):
+                target_id = f"({child},{name})"
+                edge(source_id, target_id, name, rule)
+                for trigger in triggers[1:]:
+                    out.append(f"linked(edge,({source_id},{target_id}),{trigger}).\n")
+                for trigger in triggers:
+                    out.append(f"linked(node,{target_id},{trigger}).\n")
+    return "".join(out)
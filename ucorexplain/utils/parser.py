@@ -7,13 +7,15 @@ from argparse import ArgumentParser, FileType, RawTextHelpFormatter
 from textwrap import dedent
 from typing import Any, cast
 
-from pkg_resources import DistributionNotFound, require
+from importlib.metadata import PackageNotFoundError, version
+
+from ..cache import default_cache_dir
 
 __all__ = ["get_parser"]
 
 try:
-    VERSION = require("ucorexplain")[0].version
-except DistributionNotFound:  # nocoverage
+    VERSION = version("ucorexplain")
+except PackageNotFoundError:  # nocoverage
     VERSION = "local"  # nocoverage
 
 
@@ -53,7 +55,7 @@ def get_parser() -> ArgumentParser:
 
     parser.add_argument(
         "--log",
-        default="warning",
+        default="info",
         choices=[val for _, val in levels],
         metavar=f"{{{','.join(key for key, _ in levels)}}}",
         help="set log level [%(default)s]",
@@ -68,12 +70,116 @@ def get_parser() -> ArgumentParser:
         "--prg", "-p", action="append", help="Program files", type=FileType("r")
     )
 
-    parser.add_argument("--answer", "-a", help="Answer set as facts", default="")
+    answers = parser.add_mutually_exclusive_group()
+    answers.add_argument("--answer", "-a", help="Answer set as facts", default="")
+    answers.add_argument(
+        "--answer-file",
+        help="File with the answer set as facts or as clingo JSON output (--outf=2), - for stdin; "
+        "read incrementally, for answer sets too large for --answer",
+        metavar="FILE",
+    )
+    answers.add_argument(
+        "--solve",
+        help="Solve the program and explain its N-th answer set instead of the one given with --answer; "
+        "the Herbrand base is computed from the same grounding",
+        metavar="N",
+        type=int,
+        default=None,
+    )
     parser.add_argument(
         "--false", "-f", help="Atoms that are false as facts", default=""
     )
+    parser.add_argument(
+        "--false-file",
+        help="File with the false atoms, as for --answer-file",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--input-format",
+        help="Format of the files given with --answer-file, --false-file and --query-file; "
+        "auto recognizes JSON by the extension .json or a leading '{' [%(default)s]",
+        choices=["auto", "facts", "json"],
+        default="auto",
+    )
+    parser.add_argument(
+        "--witness",
+        help="Witness to read from clingo JSON output, starting from 1 [last one]",
+        metavar="N",
+        type=int,
+        default=None,
+    )
 
-    parser.add_argument("--query", "-q", help="Query atom as facts", required=True)
+    queries = parser.add_mutually_exclusive_group(required=True)
+    queries.add_argument("--query", "-q", help="Query atom as facts")
+    queries.add_argument(
+        "--query-file",
+        help="File with the query atoms, as for --answer-file",
+        metavar="FILE",
+    )
+    queries.add_argument(
+        "--queries",
+        help="File with one query per line (as facts) to explain in a single run, - for stdin",
+        type=FileType("r"),
+    )
+    queries.add_argument(
+        "--explain-all",
+        help="Explain into one merged graph the atoms of the answer set with the given predicates"
+        " (name/arity or name, separated by spaces), or the given atoms as facts",
+        metavar="ATOMS",
+    )
+    queries.add_argument(
+        "--server",
+        help="Keep the program loaded and answer JSON requests, one per line, from stdin or --socket",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--socket",
+        help="Unix socket where --server listens instead of stdin/stdout",
+    )
+    parser.add_argument(
+        "--workers",
+        help="Number of requests --server handles at the same time [1]",
+        default=None,
+        type=int,
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of processes explaining the --queries in parallel [%(default)s]",
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        "--graph-format",
+        help="Format of the graphs saved for --queries and --explain-all: "
+        "facts (lp) or compact binary (ucxg) [%(default)s]",
+        choices=["lp", "ucxg"],
+        default="lp",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of the cache reused across runs [%(default)s]",
+        default=default_cache_dir(),
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="Do not read or write the cache",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--no-explanation-cache",
+        help="Compute the explanation graphs again instead of reusing the ones cached by earlier runs",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--output-dir",
+        "-o",
+        help="Directory where the graphs of --queries and --explain-all are saved [%(default)s]",
+        default=".",
+    )
     parser.add_argument(
         "--view", "-w", help="View with clingraph", default=False, action="store_true"
     )
@@ -81,7 +187,8 @@ def get_parser() -> ArgumentParser:
     parser.add_argument(
         "--move-before",
         "-m",
-        help="Moves the given atom (with possible) variables before in the herbrand base giving it preference.",
+        help="Moves the given atom (with possible) variables before in the herbrand base giving it preference. "
+        "Can be repeated; later patterns take priority over earlier ones.",
         action="append",
     )
     parser.add_argument(
@@ -97,6 +204,87 @@ def get_parser() -> ArgumentParser:
         default=False,
         action="store_true",
     )
+    parser.add_argument(
+        "--depth",
+        help="Show and save only the nodes within N links from the query; "
+        "nodes with hidden reasons are marked as truncated",
+        metavar="N",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--max-nodes",
+        help="Show and save only the first N nodes, breadth-first from the query",
+        metavar="N",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--expand",
+        help="Show the reasons of the given atom whatever --depth and --max-nodes; can be repeated",
+        metavar="ATOM",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--timeout",
+        help="Stop solving after the given seconds for each query and keep the graph computed so far, "
+        "marked as incomplete",
+        metavar="SECONDS",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--clingo-args",
+        help="Arguments for every clingo control, as '--parallel-mode=4' or '--configuration=trendy'; "
+        "can be repeated",
+        metavar="ARGS",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--slice",
+        help="Explain the query with only the rules and atoms connected to it (and to the false atoms)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--check-slice",
+        help="Explain the query with and without --slice and report whether the graphs differ",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--core",
+        help="Instead of the explanation graph, print a minimal set of rules entailing the query, "
+        "shrinking the unsat core with the given strategy",
+        choices=["deletion", "quickxplain", "progression"],
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        help="Print the wall time, CPU time and peak memory usage of each stage",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-json",
+        help="Write the profiling report (implies --profile) to the given JSON file",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile-memory",
+        help="Also trace the Python memory of each stage (implies --profile, slows down Python code)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--solver-stats",
+        help="Write the statistics of every solver call of the explanation to the given JSON or CSV (.csv) file,"
+        " logging a summary of each query",
+        metavar="FILE",
+        default=None,
+    )
     parser.add_argument(
         "--verbose",
         help="Verbose mode to show intermediate steps",
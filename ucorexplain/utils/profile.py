@@ -0,0 +1,187 @@
+"""
+Per-stage profiling of wall time, CPU time and peak memory.
+
+Stages are marked with ``stage(name)``; they are recorded only while a Profiler is active, for example::
+
+    with Profiler() as profiler:
+        herbrand_base_of(program, answer_set, query, false_atoms)
+    print(profiler.table())
+
+When no Profiler is active, ``stage`` returns a shared no-op context manager.
+"""
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # nocoverage
+    resource = None  # type: ignore
+
+__all__ = ["Profiler", "stage"]
+
+_NULL_STAGE = contextlib.nullcontext()
+_active: Optional["Profiler"] = None  # pylint: disable=invalid-name
+
+
+@dataclass
+class Stage:
+    """
+    Measures of a stage; memory is in bytes.
+
+    max_rss is the peak resident set size of the process when the stage ends (including memory allocated by clingo),
+    and peak_memory is the peak of memory allocated by Python during the stage (only if memory is traced).
+    """
+
+    name: str
+    depth: int
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    max_rss: int = 0
+    peak_memory: int = 0
+
+
+def stage(name: str):
+    """
+    Return a context manager recording the enclosed code as a stage of the active Profiler, if any.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _active.stage(name)
+
+
+def _max_rss() -> int:
+    if resource is None:  # nocoverage
+        return 0
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Profiler:
+    """
+    Collect the stages run while active; stages with the same name are added up.
+
+    With trace_memory, the Python memory of each stage is measured with tracemalloc, which slows down Python code.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: dict[str, Stage] = {}
+        self._open: list[list[int]] = []
+        self._started_tracing = False
+        self._previous: Optional["Profiler"] = None
+
+    def __enter__(self) -> "Profiler":
+        global _active  # pylint: disable=global-statement
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *args) -> None:
+        global _active  # pylint: disable=global-statement
+        _active = self._previous
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Record the enclosed code as a stage; stages can be nested.
+        """
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = Stage(name, len(self._open))
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            if self._open:
+                # keep the peak of the enclosing stage before resetting it
+                self._open[-1][0] = max(
+                    self._open[-1][0], tracemalloc.get_traced_memory()[1]
+                )
+            tracemalloc.reset_peak()
+        peak = [0]
+        self._open.append(peak)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall += time.perf_counter() - wall
+            record.cpu += time.process_time() - cpu
+            record.calls += 1
+            record.max_rss = max(record.max_rss, _max_rss())
+            self._open.pop()
+            if tracing:
+                peak[0] = max(peak[0], tracemalloc.get_traced_memory()[1])
+                record.peak_memory = max(record.peak_memory, peak[0])
+                if self._open:
+                    self._open[-1][0] = max(self._open[-1][0], peak[0])
+
+    def as_dict(self) -> dict:
+        """
+        Return the stages, in the order they were first entered, and the peak resident set size of the process.
+        """
+        return {
+            "stages": [
+                {
+                    "name": record.name,
+                    "depth": record.depth,
+                    "calls": record.calls,
+                    "wall": record.wall,
+                    "cpu": record.cpu,
+                    "max_rss": record.max_rss,
+                    **(
+                        {"peak_memory": record.peak_memory} if self.trace_memory else {}
+                    ),
+                }
+                for record in self.stages.values()
+            ],
+            "max_rss": _max_rss(),
+        }
+
+    def table(self) -> str:
+        """
+        Format the stages as a table, in the order they were first entered.
+        """
+        header = ("stage", "calls", "wall (s)", "cpu (s)", "max rss (MiB)")
+        rows = [header + (("python peak (MiB)",) if self.trace_memory else ())]
+        for record in self.stages.values():
+            row: Tuple[str, ...] = (
+                "  " * record.depth + record.name,
+                str(record.calls),
+                f"{record.wall:.3f}",
+                f"{record.cpu:.3f}",
+                f"{record.max_rss / 2**20:.1f}",
+            )
+            if self.trace_memory:
+                row += (f"{record.peak_memory / 2**20:.1f}",)
+            rows.append(row)
+        widths = [
+            max(len(row[column]) for row in rows) for column in range(len(rows[0]))
+        ]
+        lines = [
+            "  ".join(
+                cell.ljust(width) if column == 0 else cell.rjust(width)
+                for column, (cell, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        ]
+        lines.insert(1, "-" * len(lines[0]))
+        return "\n".join(lines)
+
+    def write_json(self, file_name: str) -> None:
+        """
+        Write the stages, as returned by as_dict(), to a JSON file.
+        """
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
@@ -0,0 +1,102 @@
+"""
+Reordering of ground atoms by an ordered list of patterns, as a chain of SymbolicProgram.move_before calls.
+"""
+
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import clingo
+from clingo.ast import ASTType
+from dumbo_asp.primitives.atoms import GroundAtom, SymbolicAtom
+
+__all__ = ["move_before"]
+
+Matcher = Optional[Callable[[clingo.Symbol], bool]]
+
+
+def _never(_symbol: clingo.Symbol) -> bool:
+    return False
+
+
+def _term_matcher(term: clingo.ast.AST) -> Matcher:
+    """
+    Compile a term of a pattern; None stands for a term matching everything.
+    """
+    if term.ast_type == ASTType.Variable:
+        return None
+    if term.ast_type == ASTType.Function:
+        return _function_matcher(term.name, term.arguments)
+    if term.ast_type == ASTType.SymbolicTerm:
+        expected = term.symbol
+    else:
+        # e.g., negative numbers; terms with variables inside operations never match
+        try:
+            expected = clingo.parse_term(str(term))
+        except RuntimeError:
+            return _never
+    return lambda symbol: symbol == expected
+
+
+def _function_matcher(name: str, arguments: Sequence[clingo.ast.AST]) -> Matcher:
+    matchers = [
+        (index, matcher)
+        for index, matcher in enumerate(
+            _term_matcher(argument) for argument in arguments
+        )
+        if matcher is not None
+    ]
+    arity = len(arguments)
+
+    def match(symbol: clingo.Symbol) -> bool:
+        if symbol.type != clingo.SymbolType.Function or symbol.name != name:
+            return False
+        symbol_arguments = symbol.arguments
+        return len(symbol_arguments) == arity and all(
+            matcher(symbol_arguments[index]) for index, matcher in matchers
+        )
+
+    return match
+
+
+def _compile(pattern: SymbolicAtom) -> tuple[tuple[str, int], Matcher]:
+    value = pattern.make_copy_of_value()
+    if value.ast_type == ASTType.SymbolicAtom:
+        value = value.symbol
+    if value.ast_type != ASTType.Function:
+        return ("", -1), _never
+    name, arguments = value.name, value.arguments
+    matchers = [_term_matcher(argument) for argument in arguments]
+    if all(matcher is None for matcher in matchers):
+        return (name, len(arguments)), None
+    return (name, len(arguments)), _function_matcher(name, arguments)
+
+
+def move_before(
+    atoms: Iterable[GroundAtom], patterns: Sequence[Union[str, SymbolicAtom]]
+) -> tuple[GroundAtom, ...]:
+    """
+    Move the atoms matching the patterns to the front, the last pattern taking priority over the previous ones.
+
+    The result is the same as calling SymbolicProgram.move_before once for each pattern, but it is computed in a
+    single pass over the atoms: every atom is only tested against the patterns of its predicate.
+    """
+    by_predicate: dict[tuple[str, int], list[tuple[int, Matcher]]] = {}
+    for index, pattern in enumerate(patterns):
+        if isinstance(pattern, str):
+            pattern = SymbolicAtom.parse(pattern)
+        predicate, matcher = _compile(pattern)
+        by_predicate.setdefault(predicate, []).append((index, matcher))
+
+    # atoms matching pattern i get bit i; a larger mask means a higher priority
+    buckets: dict[int, list[GroundAtom]] = {}
+    for atom in atoms:
+        mask = 0
+        symbol = atom.value
+        for index, matcher in by_predicate.get(
+            (symbol.name, len(symbol.arguments)), ()
+        ):
+            if matcher is None or matcher(symbol):
+                mask |= 1 << index
+        buckets.setdefault(mask, []).append(atom)
+    return tuple(
+        atom for mask in sorted(buckets, reverse=True) for atom in buckets[mask]
+    )
@@ -0,0 +1,231 @@
+"""
+Per-call statistics of the clingo solver calls made by the Explainer.
+
+Calls are recorded only while a SolverStatistics is active, as stages are while a Profiler is active::
+
+    with SolverStatistics(logger) as statistics:
+        explainer.explain(answer_set, query)
+    statistics.write("statistics.csv")
+
+Each call is recorded with the query being explained, the step of the explanation (``pus`` while the preferred
+unsatisfiable set is searched, ``derivation`` and ``links`` while the graph is built), the graph nodes it
+justified, the size of the ground program of the control and the counters of clingo.
+With a logger, every call is logged at debug level and every query is summarized at info level as it ends.
+"""
+
+import contextlib
+import csv
+import json
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Iterable, List, Optional
+
+import clingo
+
+__all__ = ["SolverCall", "SolverStatistics", "explaining", "solver_call"]
+
+STEPS = ("pus", "derivation", "links")
+
+_NULL_CONTEXT = contextlib.nullcontext()
+_active: Optional["SolverStatistics"] = None
+
+
+@dataclass
+class SolverCall:
+    """
+    Statistics of a solver call; times are in seconds.
+
+    wall is the time of the call measured around it, solve_time the one reported by clingo; atoms and rules are
+    the size of the ground program of the control, which grows with the rules added for each query.
+    nodes are the graph nodes justified by a derivation step, or the query atoms for the other steps.
+    """
+
+    query: str
+    step: str
+    result: str
+    wall: float
+    solve_time: float
+    choices: int
+    conflicts: int
+    restarts: int
+    atoms: int
+    rules: int
+    nodes: tuple[str, ...]
+
+
+def _result(result: Optional[clingo.SolveResult]) -> str:
+    if result is None:
+        return "interrupted"
+    if result.satisfiable:
+        return "sat"
+    return "unsat" if result.unsatisfiable else "unknown"
+
+
+def _shown(nodes: tuple[str, ...], limit: int = 3) -> str:
+    if len(nodes) <= limit:
+        return " ".join(nodes)
+    return f"{' '.join(nodes[:limit])} and {len(nodes) - limit} more"
+
+
+def explaining(query: Iterable):
+    """
+    Return a context manager attributing the enclosed solver calls to the query, if a SolverStatistics is active.
+    """
+    if _active is None:
+        return _NULL_CONTEXT
+    return _active.explaining(query)
+
+
+def solver_call(
+    control: clingo.Control,
+    step: str,
+    solve: Callable[[], Optional[clingo.SolveResult]],
+    nodes: Callable[[], Iterable] = tuple,
+) -> Optional[clingo.SolveResult]:
+    """
+    Run solve() and record its statistics in the active SolverStatistics, if any; return what solve() returns.
+
+    nodes() is called after solving, so that it can return what the call derived.
+    """
+    if _active is None:
+        return solve()
+    start = time.perf_counter()
+    result = solve()
+    _active.record(control, step, result, time.perf_counter() - start, nodes())
+    return result
+
+
+class SolverStatistics:
+    """
+    Collect the solver calls made while active.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger
+        self.calls: List[SolverCall] = []
+        self._query: tuple[str, ...] = ()
+        self._previous: Optional["SolverStatistics"] = None
+
+    def __enter__(self) -> "SolverStatistics":
+        global _active  # pylint: disable=global-statement
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *args) -> None:
+        global _active  # pylint: disable=global-statement
+        _active = self._previous
+
+    @contextlib.contextmanager
+    def explaining(self, query: Iterable):
+        """
+        Attribute the enclosed solver calls to the query, and log their summary at the end.
+        """
+        previous, self._query = self._query, tuple(str(atom) for atom in query)
+        first = len(self.calls)
+        try:
+            yield self
+        finally:
+            if self.logger is not None:
+                self.logger.info(
+                    "Solver calls for %s: %s",
+                    " ".join(self._query),
+                    self._summary_line(self.calls[first:]),
+                )
+            self._query = previous
+
+    def record(
+        self,
+        control: clingo.Control,
+        step: str,
+        result: Optional[clingo.SolveResult],
+        wall: float,
+        nodes: Iterable,
+    ) -> SolverCall:
+        statistics = control.statistics
+        solvers = statistics["solving"]["solvers"]
+        program = statistics["problem"]["lp"]
+        call = SolverCall(
+            query=" ".join(self._query),
+            step=step,
+            result=_result(result),
+            wall=wall,
+            solve_time=statistics["summary"]["times"]["solve"],
+            choices=int(solvers["choices"]),
+            conflicts=int(solvers["conflicts"]),
+            restarts=int(solvers["restarts"]),
+            atoms=int(program["atoms"]),
+            rules=int(program["rules"]),
+            nodes=tuple(str(node) for node in nodes) or self._query,
+        )
+        self.calls.append(call)
+        if self.logger is not None:
+            self.logger.debug(
+                "%s call %d (%s): %s in %.3fs, %d choices, %d conflicts, %d atoms, %d rules",
+                step,
+                len(self.calls),
+                _shown(call.nodes),
+                call.result,
+                call.wall,
+                call.choices,
+                call.conflicts,
+                call.atoms,
+                call.rules,
+            )
+        return call
+
+    @staticmethod
+    def _summary_line(calls: List[SolverCall]) -> str:
+        parts = []
+        for step in STEPS:
+            selected = [call for call in calls if call.step == step]
+            if selected:
+                parts.append(
+                    f"{len(selected)} {step} in {sum(call.wall for call in selected):.3f}s"
+                    f" ({sum(call.conflicts for call in selected)} conflicts,"
+                    f" {sum(call.choices for call in selected)} choices)"
+                )
+        return ", ".join(parts) if parts else "none"
+
+    def summary(self) -> dict:
+        """
+        Return, for each step, the number of calls and the sums of their times and counters.
+        """
+        res = {}
+        for step in STEPS:
+            selected = [call for call in self.calls if call.step == step]
+            if selected:
+                res[step] = {
+                    "calls": len(selected),
+                    **{
+                        name: sum(getattr(call, name) for call in selected)
+                        for name in (
+                            "wall",
+                            "solve_time",
+                            "choices",
+                            "conflicts",
+                            "restarts",
+                        )
+                    },
+                }
+        return res
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": [asdict(call) for call in self.calls],
+            "summary": self.summary(),
+        }
+
+    def write(self, file_name: str) -> None:
+        """
+        Write the calls to a CSV file if file_name ends with .csv (nodes are separated by spaces), else to JSON.
+        """
+        with open(file_name, "w", newline="") as f:
+            if not file_name.endswith(".csv"):
+                json.dump(self.as_dict(), f, indent=2)
+                return
+            writer = csv.writer(f)
+            writer.writerow([field.name for field in fields(SolverCall)])
+            for call in self.calls:
+                row = asdict(call)
+                row["nodes"] = " ".join(call.nodes)
+                writer.writerow(row.values())
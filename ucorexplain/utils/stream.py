@@ -0,0 +1,140 @@
+"""
+Streaming readers of ground atoms, from files of facts or from the JSON output of clingo (``--outf=2``).
+
+Input is read in chunks and each atom is parsed with clingo.parse_term as soon as it is complete,
+without building a program; only the atoms themselves are kept in memory.
+"""
+
+import json
+import re
+import sys
+from typing import IO, Iterable, Iterator, List, Optional
+
+import clingo
+from dumbo_asp.primitives.atoms import GroundAtom
+from dumbo_asp.primitives.models import Model
+
+__all__ = ["read_clingo_json", "read_facts", "read_model"]
+
+CHUNK_SIZE = 1 << 16
+
+FACTS_TOKEN = re.compile(
+    r'\s+|%\*.*?\*%|%(?!\*)[^\n]*(?:\n|$)|"(?:[^"\\]|\\.)*"|\.|[^\s."%]+', re.DOTALL
+)
+JSON_TOKEN = re.compile(r'\s+|"(?:[^"\\]|\\.)*"|[{}\[\]:,]|[^\s{}\[\]:,"]+')
+
+
+def _tokens(stream: IO[str], pattern: re.Pattern, buffer: str = "") -> Iterator[str]:
+    """
+    Split the stream into tokens; a token touching the end of the buffer is completed with the next chunk.
+    """
+    position = 0
+    eof = False
+    while True:
+        match = pattern.match(buffer, position)
+        if match is None or (match.end() == len(buffer) and not eof):
+            if eof:
+                if position < len(buffer):
+                    raise ValueError(
+                        f"unexpected input: {buffer[position:position + 40]!r}"
+                    )
+                return
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        position = match.end()
+        yield match.group()
+
+
+def _atom(string: str) -> clingo.Symbol:
+    try:
+        symbol = clingo.parse_term(string)
+    except RuntimeError as e:
+        raise ValueError(f"not a ground atom: {string!r}") from e
+    if symbol.type != clingo.SymbolType.Function:
+        raise ValueError(f"not a ground atom: {string!r}")
+    return symbol
+
+
+def read_facts(stream: IO[str], buffer: str = "") -> Iterator[clingo.Symbol]:
+    """
+    Yield the atoms of a file of ground facts, skipping comments.
+    """
+    statement: List[str] = []
+    for token in _tokens(stream, FACTS_TOKEN, buffer):
+        if token == ".":
+            yield _atom("".join(statement))
+            statement.clear()
+        elif not token[0].isspace() and token[0] != "%":
+            statement.append(token)
+    if "".join(statement).strip():
+        raise ValueError(f"missing '.' after {''.join(statement)!r}")
+
+
+def read_clingo_json(
+    stream: IO[str], witness: Optional[int] = None, buffer: str = ""
+) -> List[clingo.Symbol]:
+    """
+    Return the atoms of a witness (starting from 1, by default the last one) in the output of clingo --outf=2.
+
+    Only the selected witness is kept in memory.
+    """
+    selected: Optional[List[clingo.Symbol]] = None
+    count = 0
+    previous: List[str] = []
+    values: Optional[List[clingo.Symbol]] = None
+    for token in _tokens(stream, JSON_TOKEN, buffer):
+        if token[0].isspace():
+            continue
+        if values is not None:
+            if token == "]":
+                count += 1
+                if witness is None or count == witness:
+                    selected = values
+                values = None
+            elif token[0] == '"':
+                if witness is None or count + 1 == witness:
+                    values.append(_atom(json.loads(token)))
+            elif token != ",":
+                raise ValueError(f"unexpected {token!r} in a witness")
+            continue
+        previous = (previous + [token])[-3:]
+        if previous == ['"Value"', ":", "["]:
+            values = []
+    if selected is None:
+        if witness is None or count == 0:
+            raise ValueError("no witness in the clingo output")
+        raise ValueError(f"only {count} witnesses in the clingo output")
+    return selected
+
+
+def read_model(
+    file_name: str, input_format: str = "auto", witness: Optional[int] = None
+) -> Model:
+    """
+    Read the atoms of a file ('-' for stdin) of facts or clingo JSON output into a (sorted) model.
+
+    With input_format auto, JSON is recognized by the extension .json or by a leading '{'.
+    """
+    stream = sys.stdin if file_name == "-" else open(file_name)
+    try:
+        buffer = ""
+        if input_format == "auto":
+            while not buffer.strip():
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                buffer += chunk
+            is_json = file_name.endswith(".json") or buffer.lstrip().startswith("{")
+            input_format = "json" if is_json else "facts"
+        symbols: Iterable[clingo.Symbol]
+        if input_format == "json":
+            symbols = read_clingo_json(stream, witness, buffer)
+        else:
+            symbols = read_facts(stream, buffer)
+        return Model.of_atoms(GroundAtom(symbol) for symbol in dict.fromkeys(symbols))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
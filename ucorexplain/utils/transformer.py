@@ -10,16 +10,24 @@ RULE_ID_SIGNATURE = "_rule"
 class RuleTransformer(Transformer):
     def __init__(self):
         self.rule_id = 0
+        self.rules: List[str] = []
 
     def visit_Rule(self, node):
+        self.rules.append(str(node))
         # add for each rule a theory atom (RULE_ID_SIGNATURE) with the id as an argument
-        symbol = _ast.Function(
-            location=node.location,
-            name=RULE_ID_SIGNATURE,
-            arguments=[
-                _ast.SymbolicTerm(node.location, clingo.parse_term(str(self.rule_id)))
-            ],
-            external=0,
+        symbol = _ast.Literal(
+            node.location,
+            _ast.Sign.NoSign,
+            _ast.SymbolicAtom(
+                _ast.Function(
+                    location=node.location,
+                    name=RULE_ID_SIGNATURE,
+                    arguments=[
+                        _ast.SymbolicTerm(node.location, clingo.Number(self.rule_id))
+                    ],
+                    external=0,
+                )
+            ),
         )
 
         # increase the rule_id by one after every transformed rule
@@ -31,16 +39,90 @@ class RuleTransformer(Transformer):
 
     def get_transformed(self, program_string: str) -> str:
         self.rule_id = 1
+        self.rules = []
         out = []
         parse_string(program_string, lambda stm: out.append((str(self(stm)))))
-        out.append(
-            f"{{_rule(1..{self.rule_id})}} % Choice rule to allow all _rule atoms to become assumptions"
-        )
+        # choice rule to allow all _rule atoms to become assumptions
+        out.append(f"{{{RULE_ID_SIGNATURE}(1..{self.rule_id - 1})}}.")
         return "\n".join(out)
 
-    # TODO : Not a nice implementation. Should be refined in the future
+    def get_symbol(self, rule_id: int) -> clingo.Symbol:
+        return clingo.Function(RULE_ID_SIGNATURE, [clingo.Number(rule_id)])
+
     def get_assumptions(self) -> List[Tuple[clingo.Symbol, bool]]:
+        return [(self.get_symbol(rule_id), True) for rule_id in range(1, self.rule_id)]
+
+
+HERBRAND_BASE_SIGNATURE = "__hb"
+
+
+class _HerbrandBaseAtoms(Transformer):
+    def visit_SymbolicAtom(self, node):
+        return node.update(
+            symbol=_ast.Function(
+                node.symbol.location, HERBRAND_BASE_SIGNATURE, [node.symbol], 0
+            )
+        )
+
+
+class HerbrandBaseTransformer:
+    """
+    Build a copy of a program whose atoms are wrapped in __hb/1 and whose negative literals are dropped,
+    with one rule for each head atom, as SymbolicProgram.herbrand_base does.
+
+    Grounded together with the program, the copy is a definite program whose __hb/1 atoms form the Herbrand base,
+    while the answer sets of the program are unchanged.
+    """
+
+    def __init__(self):
+        self._atoms = _HerbrandBaseAtoms()
+
+    @staticmethod
+    def _positive(literal) -> bool:
+        if literal.ast_type == _ast.ASTType.ConditionalLiteral:
+            literal = literal.literal
+        return (
+            literal.ast_type != _ast.ASTType.Literal or literal.sign == _ast.Sign.NoSign
+        )
+
+    @staticmethod
+    def _head_elements(head):
+        if head.ast_type == _ast.ASTType.Literal:
+            if (
+                head.sign == _ast.Sign.NoSign
+                and head.atom.ast_type == _ast.ASTType.SymbolicAtom
+            ):
+                yield head, []
+        elif head.ast_type in (_ast.ASTType.Disjunction, _ast.ASTType.Aggregate):
+            for element in head.elements:
+                if element.literal.sign == _ast.Sign.NoSign:
+                    yield element.literal, element.condition
+
+    def transform(self, statement) -> List[str]:
+        if statement.ast_type != _ast.ASTType.Rule:
+            return []
+        body = [
+            self._atoms(literal)
+            for literal in statement.body
+            if self._positive(literal)
+        ]
         return [
-            (clingo.parse_term(f"{RULE_ID_SIGNATURE}({rule_id})"), True)
-            for rule_id in range(1, self.rule_id)
+            str(
+                _ast.Rule(
+                    statement.location,
+                    self._atoms(literal),
+                    [
+                        self._atoms(element)
+                        for element in condition
+                        if self._positive(element)
+                    ]
+                    + body,
+                )
+            )
+            for literal, condition in self._head_elements(statement.head)
         ]
+
+    def get_transformed(self, program_string: str) -> str:
+        out: List[str] = []
+        parse_string(program_string, lambda stm: out.extend(self.transform(stm)))
+        return "\n".join(out)